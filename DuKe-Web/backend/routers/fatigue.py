@@ -30,8 +30,9 @@ class FatigueReport(BaseModel):
 async def get_current_fatigue():
     """获取当前疲劳度分数和等级"""
     try:
-        # 读取日志
-        logs = focus_fatigue_calculator.read_focus_log("../focus_log.txt")
+        # 读取今天的日志（按日期索引查询）
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        logs = focus_fatigue_calculator.read_focus_log(start_date=today, end_date=today)
         
         # 过滤今天的日志
         today_logs = focus_fatigue_calculator.filter_today_logs(logs)
@@ -92,27 +93,25 @@ async def generate_fatigue_report():
 async def get_historical_fatigue(days: int = 7):
     """获取历史疲劳度数据"""
     try:
-        # 读取日志
-        logs = focus_fatigue_calculator.read_focus_log("../focus_log.txt")
-        
-        # 按日期分组
-        date_groups = {}
-        for log in logs:
-            date_str = log['timestamp'].strftime("%Y-%m-%d")
-            if date_str not in date_groups:
-                date_groups[date_str] = []
-            date_groups[date_str].append(log)
+        # 最近 days 天每日的记录数、分心数及其覆盖的秒数（直接由事件库按日期聚合，不加载日志）
+        today = datetime.datetime.now().date()
+        start_date = today - datetime.timedelta(days=days - 1)
+        daily_counts = focus_fatigue_calculator.read_daily_counts(start_date.strftime("%Y-%m-%d"),
+                                                                  today.strftime("%Y-%m-%d"))
         
         # 计算每日疲劳度
         results = []
-        today = datetime.datetime.now().date()
         
         for i in range(days):
             date = today - datetime.timedelta(days=i)
             date_str = date.strftime("%Y-%m-%d")
             
-            if date_str in date_groups:
-                fatigue_score, distraction, total = focus_fatigue_calculator.compute_fatigue_score(date_groups[date_str])
+            if date_str in daily_counts:
+                distraction = daily_counts[date_str]["distracted"]
+                total = daily_counts[date_str]["total"]
+                # 按每条判定覆盖的时长加权：分心后检查更频繁，按条数计算会高估分心比例
+                fatigue_score = focus_fatigue_calculator.score_from_counts(
+                    daily_counts[date_str]["distracted_seconds"], daily_counts[date_str]["seconds"])
                 level, advice, color, _ = focus_fatigue_calculator.get_fatigue_level_and_advice(fatigue_score)
                 
                 results.append({
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
 import sys
-import os
 
 # 添加DuKe系统的路径
 sys.path.append("../../")
@@ -25,7 +25,10 @@ class MonitorStatus(BaseModel):
 
 # 全局变量跟踪状态
 monitor_status = MonitorStatus(is_running=False)
+# 当前这次监控的设置，用于判断后台任务结束时是否仍是最新一次运行
 monitor_task = None
+# 等待上一次监控完成清理（关闭提醒分发器、日志写入器、OCR进程池）的最长秒数
+STOP_TIMEOUT = 30
 
 # 后台任务：启动监控
 def start_monitoring_task(settings: MonitorSettings):
@@ -43,8 +46,11 @@ def start_monitoring_task(settings: MonitorSettings):
             headless=True  # 无界面模式
         )
     except Exception as e:
-        monitor_status.is_running = False
         print(f"监控任务出错: {str(e)}")
+    finally:
+        # 无论正常退出、出错还是停止超时后才退出，都重置运行状态（除非已有新的一次运行）
+        if monitor_task is settings:
+            monitor_status.is_running = False
 
 @router.post("/start")
 async def start_monitoring(settings: MonitorSettings, background_tasks: BackgroundTasks):
@@ -54,7 +60,13 @@ async def start_monitoring(settings: MonitorSettings, background_tasks: Backgrou
     if monitor_status.is_running:
         raise HTTPException(status_code=400, detail="监控已在运行中")
     
+    # 等待上一次监控彻底退出，避免新旧两次运行共用提醒分发器和日志写入器
+    stopped = await asyncio.get_running_loop().run_in_executor(None, focus_monitor.wait_for_stop, STOP_TIMEOUT)
+    if not stopped:
+        raise HTTPException(status_code=409, detail="上一次监控仍在停止中，请稍后再试")
+    
     # 更新状态
+    monitor_task = settings
     monitor_status.is_running = True
     monitor_status.work_goal = settings.work_goal
     monitor_status.white_list = settings.white_list
@@ -75,13 +87,18 @@ async def stop_monitoring():
     
     # 停止监控
     try:
-        # 这里需要一种方式停止focus_monitor
-        # 可能需要修改原始代码以支持优雅停止
-        # 临时方案：设置一个停止标志
-        if hasattr(focus_monitor, "stop_monitoring"):
-            focus_monitor.stop_monitoring = True
+        # 取消监控流水线任务（线程安全）
+        cancelled = focus_monitor.stop_monitor()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"停止监控失败: {str(e)}")
+    if not cancelled:
+        raise HTTPException(status_code=500, detail="停止监控失败: 监控流水线未在运行")
+    
+    # 等待监控线程完成清理后再报告已停止
+    stopped = await asyncio.get_running_loop().run_in_executor(None, focus_monitor.wait_for_stop, STOP_TIMEOUT)
+    if not stopped:
+        # 监控仍在清理，后台任务退出时会重置运行状态
+        return {"message": f"监控正在停止（未在{STOP_TIMEOUT}秒内完成清理）", "status": monitor_status}
     
     # 更新状态
     monitor_status.is_running = False
@@ -94,24 +111,35 @@ async def get_monitor_status():
     global monitor_status
     return monitor_status
 
+@router.get("/stats")
+async def get_monitor_stats():
+    """获取监控优化统计（截屏变化检测跳过率、OCR分块缓存、判定缓存命中率等）"""
+    return {
+        "frame_change": focus_monitor.get_frame_change_stats(),
+        "tile_cache": focus_monitor.get_tile_cache_stats(),
+        "verdict_cache": focus_monitor.get_verdict_cache_stats(),
+        "interventions": focus_monitor.get_intervention_stats()
+    }
+
+@router.websocket("/alerts")
+async def alerts_websocket(websocket: WebSocket):
+    """推送分心提醒（已限流并合并重复提醒）"""
+    await websocket.accept()
+    subscriber = focus_monitor.interventions.BROADCAST_SINK.subscribe()
+    try:
+        while True:
+            alert = await subscriber.get()
+            await websocket.send_json(dict(alert, message=focus_monitor.interventions.format_alert_message(alert)))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        focus_monitor.interventions.BROADCAST_SINK.unsubscribe(subscriber)
+
 @router.get("/recent_logs")
 async def get_recent_logs(count: int = 10):
     """获取最近的监控日志"""
     try:
-        log_file = "../focus_log.txt"
-        if not os.path.exists(log_file):
-            return {"logs": []}
-        
-        with open(log_file, "r", encoding="utf-8") as f:
-            content = f.read()
-        
-        # 简单解析日志
-        log_entries = []
-        segments = content.split("-" * 50)
-        for segment in segments[-count-1:-1]:  # 获取最近的n条记录
-            if segment.strip():
-                log_entries.append(segment.strip())
-        
-        return {"logs": log_entries}
+        records = focus_monitor.focus_store.get_store(log_path=focus_monitor.LOG_FILE).last_records(count)
+        return {"logs": [focus_monitor.focus_log.format_record(record) for record in records]}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"读取日志失败: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"读取日志失败: {str(e)}")
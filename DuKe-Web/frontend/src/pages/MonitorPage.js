@@ -10,6 +10,7 @@ import axios from 'axios';
 const { Title, Text } = Typography;
 const { TextArea } = Input;
 const API_URL = 'http://localhost:8000/api';
+const ALERTS_WS_URL = 'ws://localhost:8000/api/monitor/alerts';
 
 const MonitorPage = () => {
   const [form] = Form.useForm();
@@ -74,6 +75,25 @@ const MonitorPage = () => {
     return () => clearInterval(intervalId);
   }, [loading]);
 
+  // Receive distraction alerts pushed by the monitor while it is running
+  useEffect(() => {
+    if (!monitorStatus.is_running) {
+      return undefined;
+    }
+    const socket = new WebSocket(ALERTS_WS_URL);
+    socket.onmessage = (event) => {
+      const alert = JSON.parse(event.data);
+      notification.warning({
+        message: 'Intervention Reminder',
+        description: alert.message,
+        duration: 10,
+      });
+      fetchRecentLogs();
+    };
+    socket.onerror = (error) => console.error('Alert connection error', error);
+    return () => socket.close();
+  }, [monitorStatus.is_running]);
+
   // Start monitoring
   const startMonitoring = async (values) => {
     try {
@@ -0,0 +1,159 @@
+import os
+import re
+import sys
+import json
+import time
+import subprocess
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import focus_log
+from daily_analysis import parse_focus_log
+
+# Synthetic log layout
+BENCH_DAYS = 30
+BENCH_REASONS = [
+    None,
+    "Watching a video unrelated to the goal",
+    "Chatting in a messaging app while the goal is writing the report",
+    "Browsing a shopping site",
+]
+# Separator the old free-text log wrote after every entry
+LEGACY_SEPARATOR = "-" * 50
+
+
+def _outputs():
+    outputs = []
+    for reason in BENCH_REASONS:
+        output = {"status": "2. Distracted", "reason": reason} if reason else {"status": "1. Focus"}
+        output["source"] = "model"
+        outputs.append(json.dumps(output, ensure_ascii=False))
+    return outputs
+
+
+def generate_logs(directory, size_gb, days=BENCH_DAYS):
+    """Write the same synthetic entries as a free-text log and as a record log of about size_gb each"""
+    legacy_path = os.path.join(directory, "bench_focus_log.txt")
+    record_path = os.path.join(directory, "bench_focus_log.jsonl")
+    outputs = _outputs()
+    per_day = int(size_gb * 1024 ** 3 / days / 160)
+    with open(legacy_path, "w", encoding="utf-8") as legacy, open(record_path, "wb") as records:
+        records.write(focus_log.HEADER)
+        for day in range(days):
+            date = f"2026-{1 + day // 28:02d}-{1 + day % 28:02d}"
+            legacy_lines, record_lines = [], []
+            for i in range(per_day):
+                seconds = i * 86400 // per_day
+                timestamp = f"{date} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+                output = outputs[i % len(outputs)]
+                legacy_lines.append(f"[{timestamp}] Output: {output}\n{LEGACY_SEPARATOR}\n")
+                # Same bytes as focus_log.encode_record(), without re-encoding the output every time
+                payload = f'{{"timestamp": "{timestamp}", "output": {output}}}'.encode("utf-8")
+                record_lines.append(b"%d\t%s\n" % (len(payload), payload))
+            legacy.write("".join(legacy_lines))
+            records.write(b"".join(record_lines))
+    return legacy_path, record_path, date
+
+
+# ---------------------------
+# Parsers under test
+def legacy_parse_focus_log(log_path, target_date):
+    """The original parser: whole file read into one str, split, then regex-matched entry by entry"""
+    with open(log_path, "r", encoding="utf-8") as f:
+        log_content = f.read()
+    entry_pattern = r'\[([\d]{4}-[\d]{2}-[\d]{2} [\d]{2}:[\d]{2}:[\d]{2})\] Output: ({.*?})(?=\n--|-\Z|$)'
+    count = 0
+    for record in log_content.split(LEGACY_SEPARATOR):
+        if not record.strip():
+            continue
+        matches = re.search(entry_pattern, record, re.DOTALL)
+        if not matches:
+            continue
+        timestamp, json_data = matches.groups()
+        if target_date and timestamp.split()[0] != target_date:
+            continue
+        try:
+            json.loads(json_data)
+        except json.JSONDecodeError:
+            continue
+        count += 1
+    return count
+
+
+def run_case(case, path, date):
+    if case == "legacy":
+        return legacy_parse_focus_log(path, date)
+    if case == "record-day":
+        return parse_focus_log(focus_log.iter_records(path, date, date), date)["total_entries"]
+    if case == "record-all":
+        return sum(1 for _ in focus_log.iter_records(path))
+    raise ValueError(f"Unknown case: {case}")
+
+
+def peak_memory_mb():
+    # ru_maxrss survives exec on Linux and would report this process' parent, VmHWM does not
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def measure(case, path, date):
+    """Run one case in a fresh interpreter so its peak memory is its own"""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--case", case, path, date],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    size_gb = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    directory = sys.argv[2] if len(sys.argv) > 2 else "."
+
+    print(f"Generating two synthetic logs of about {size_gb:g} GB in {os.path.abspath(directory)} ...")
+    start = time.perf_counter()
+    legacy_path, record_path, last_date = generate_logs(directory, size_gb)
+    print(f"Done in {time.perf_counter() - start:.1f} s "
+          f"(text log {os.path.getsize(legacy_path) / 1024 ** 3:.2f} GB, "
+          f"record log {os.path.getsize(record_path) / 1024 ** 3:.2f} GB)")
+    print("-" * 72)
+    print(f"{'case':<36s} {'time':>10s} {'peak memory':>13s} {'entries':>10s}")
+    first_date = "2026-01-01"
+    cases = [
+        ("old text parser, one day", "legacy", legacy_path, last_date),
+        ("record log, last day", "record-day", record_path, last_date),
+        ("record log, first day", "record-day", record_path, first_date),
+        ("record log, full stream", "record-all", record_path, last_date),
+    ]
+    try:
+        for label, case, path, date in cases:
+            try:
+                result = measure(case, path, date)
+            except subprocess.CalledProcessError as e:
+                print(f"{label:<36s} failed: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+                continue
+            peak = f"{result['peak_mb']:.0f} MB" if result["peak_mb"] is not None else "n/a"
+            print(f"{label:<36s} {result['seconds']:8.2f} s {peak:>13s} {result['entries']:10d}")
+    finally:
+        for path in (legacy_path, record_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--case":
+        case_start = time.perf_counter()
+        entries = run_case(sys.argv[2], sys.argv[3], sys.argv[4])
+        print(json.dumps({"seconds": time.perf_counter() - case_start, "peak_mb": peak_memory_mb(),
+                          "entries": entries}))
+    else:
+        main()
@@ -1,47 +1,46 @@
 import os
+import sys
 import datetime
-import re
-import json
 import requests
-from typing import Generator, Dict, List, Any
+from typing import Generator, Dict, Iterable, List, Any
 import traceback
+import threading
+from collections import OrderedDict
 
-# Log file path
-LOG_FILE = "../focus_log.txt"
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import llm_client
+from common import focus_log
+from common import focus_store
+
+# Log file path (record format, see common/focus_log.py)
+LOG_FILE = focus_log.LOG_FILE
 # Flag to stop analysis
 analysis_running = False
+# Number of dates whose parsed summary is kept in memory
+SUMMARY_CACHE_DAYS = 8
+# Separator between entries in the raw log excerpt
+LOG_SEPARATOR = "-" * 50
+
+# date -> (store version of that date, summary); and (store version, dates)
+_summary_cache = OrderedDict()
+_dates_cache = None
+_cache_lock = threading.Lock()
 
-def ollama_stream_generator(prompt: str, model: str = "qwen2.5:7b") -> Generator[str, None, None]:
+def ollama_stream_generator(prompt: str, model: str = None) -> Generator[str, None, None]:
     """
     Ollama streaming response generator
     :param prompt: Input prompt text
-    :param model: Model name to use
+    :param model: Model name to use (defaults to llm_client.LLM_MODEL)
     :return: Iterator of generated text results
     """
-    endpoint = "http://120.26.224.38:11434/api/generate"
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": True,  # Enable streaming output
-        "options": {
-            "temperature": 0.7,  # Controls randomness (0-1)
-            "num_predict": 4096  # Maximum number of generated tokens
-        }
+    options = {
+        "temperature": 0.7,  # Controls randomness (0-1)
+        "num_predict": 4096  # Maximum number of generated tokens
     }
 
     try:
-        with requests.post(endpoint, json=payload, stream=True, timeout=30) as response:
-            response.raise_for_status()  # Check for HTTP errors
-
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        chunk = json.loads(line.decode('utf-8'))
-                        yield chunk.get("response", "")
-                    except json.JSONDecodeError:
-                        print(" | [JSON parsing error] ", end="", flush=True)
-                    except Exception as e:
-                        print(f" | [Data parsing error: {str(e)}] ", end="", flush=True)
+        for text in llm_client.stream_generate(prompt, model, options=options, timeout=30):
+            yield text
 
     except requests.exceptions.RequestException as e:
         print(f"\nRequest failed: {str(e)}")
@@ -49,12 +48,12 @@ def ollama_stream_generator(prompt: str, model: str = "qwen2.5:7b") -> Generator
         print(f"\nUnknown error: {str(e)}")
 
 
-def parse_focus_log(log_content: str, target_date: str = None) -> Dict[str, Any]:
+def parse_focus_log(records: Iterable[Dict[str, Any]], target_date: str = None) -> Dict[str, Any]:
     """
     Precisely parse the focus log and extract structured data
 
     Args:
-        log_content (str): Log content
+        records (iterable): Focus log records ({"timestamp", "output"}, see common/focus_log.py)
         target_date (str, optional): Target date (YYYY-MM-DD format), if provided only parse records of that date
 
     Returns:
@@ -62,27 +61,12 @@ def parse_focus_log(log_content: str, target_date: str = None) -> Dict[str, Any]
     """
     focus_entries = []
     distraction_entries = []
-
-    # Log entry regular expression, matches formats like:
-    # [2023-01-01 12:34:56] Output: {"status": "1. Focus"}
-    # or
-    # [2023-01-01 12:34:56] Output: {"status": "2. Distracted", "reason": "..."}
-    entry_pattern = r'\[([\d]{4}-[\d]{2}-[\d]{2} [\d]{2}:[\d]{2}:[\d]{2})\] Output: ({.*?})(?=\n--|-\Z|$)'
-
-    # Split log content into individual records
-    records = log_content.split("--------------------------------------------------")
+    # Foreground seconds per app, recorded by the monitor's window sampler
+    app_usage = {}
 
     # Process each record
     for record in records:
-        if not record.strip():
-            continue
-
-        # Try to match timestamp and JSON data in the record
-        matches = re.search(entry_pattern, record, re.DOTALL)
-        if not matches:
-            continue
-
-        timestamp, json_data = matches.groups()
+        timestamp = record["timestamp"]
 
         # Extract date part
         date_str = timestamp.split()[0]
@@ -91,30 +75,31 @@ def parse_focus_log(log_content: str, target_date: str = None) -> Dict[str, Any]
         if target_date and date_str != target_date:
             continue
 
-        try:
-            # Parse JSON data
-            data = json.loads(json_data)
-            entry = {
-                "timestamp": timestamp,
-                "time": timestamp.split()[1],  # Only keep the time part
-                "status": data.get("status", ""),
-                "is_focused": "1. Focus" in data.get("status", ""),
-                "reason": data.get("reason", "") if "reason" in data else None
-            }
-
-            # Classify based on status
-            if entry["is_focused"]:
-                focus_entries.append(entry)
-            else:
-                distraction_entries.append(entry)
+        data = record["output"]
+        entry = {
+            "timestamp": timestamp,
+            "time": timestamp.split()[1],  # Only keep the time part
+            "status": data.get("status", ""),
+            "is_focused": "1. Focus" in data.get("status", ""),
+            "reason": data.get("reason", "") if "reason" in data else None,
+            "interval": focus_log.verdict_interval(data)
+        }
 
-        except json.JSONDecodeError:
-            # If JSON parsing fails, try to extract information another way
-            continue
+        for app, seconds in data.get("app_durations", {}).items():
+            app_usage[app] = app_usage.get(app, 0) + seconds
+
+        # Classify based on status
+        if entry["is_focused"]:
+            focus_entries.append(entry)
+        else:
+            distraction_entries.append(entry)
 
     # Calculate analysis metrics
     total_entries = len(focus_entries) + len(distraction_entries)
-    distraction_ratio = len(distraction_entries) / total_entries if total_entries > 0 else 0
+    # Weighted by the time each verdict covers: checks come faster after a distraction
+    total_seconds = sum(entry["interval"] for entry in focus_entries + distraction_entries)
+    distraction_seconds = sum(entry["interval"] for entry in distraction_entries)
+    distraction_ratio = distraction_seconds / total_seconds if total_seconds > 0 else 0
 
     # Analyze distraction reasons
     distraction_reasons = {}
@@ -141,6 +126,7 @@ def parse_focus_log(log_content: str, target_date: str = None) -> Dict[str, Any]
         "distraction_count": len(distraction_entries),
         "distraction_ratio": distraction_ratio,
         "distraction_reasons": distraction_reasons,
+        "app_usage": app_usage,
         "timeline": all_entries,
         "time_analysis": time_analysis
     }
@@ -158,6 +144,8 @@ def analyze_time_periods(timeline: List[Dict[str, Any]]) -> Dict[str, str]:
     """
     if not timeline:
         return {
+            "period_counts": {},
+            "hour_counts": {},
             "high_focus_periods": "No data",
             "high_distraction_periods": "No data",
             "high_focus_hours": "No data",
@@ -240,6 +228,8 @@ def analyze_time_periods(timeline: List[Dict[str, Any]]) -> Dict[str, str]:
     high_distraction_hours = high_distraction_hours[:3]
 
     return {
+        "period_counts": periods,
+        "hour_counts": hours,
         "high_focus_periods": ", ".join(high_focus_periods) if high_focus_periods else "No obvious high focus period",
         "high_distraction_periods": ", ".join(high_distraction_periods) if high_distraction_periods else "No obvious high distraction period",
         "high_focus_hours": ", ".join(high_focus_hours) if high_focus_hours else "No obvious high focus hour",
@@ -267,61 +257,92 @@ def format_distraction_reasons(reasons: Dict[str, int]) -> str:
     return result
 
 
-def get_dates_from_log():
+def format_app_usage(app_usage: Dict[str, int], topn: int = 10) -> str:
     """
-    Extract all dates from the log file and return a sorted list of dates
+    Format foreground app usage
+
+    Args:
+        app_usage: Foreground seconds per application
+        topn: Number of applications to list
+
+    Returns:
+        str: Formatted app usage text
     """
-    if not os.path.exists(LOG_FILE):
-        return []
+    if not app_usage:
+        return "No app usage data recorded"
 
-    dates = set()
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        content = f.read()
-        # More accurately match dates in format [YYYY-MM-DD HH:MM:SS]
-        date_patterns = re.findall(r'\[(\d{4}-\d{2}-\d{2}) \d{2}:\d{2}:\d{2}\]', content)
-        for date in date_patterns:
-            dates.add(date)
+    result = ""
+    for app, seconds in sorted(app_usage.items(), key=lambda x: x[1], reverse=True)[:topn]:
+        result += f"- {app}: {seconds / 60:.0f} min\n"
 
-    # Sort dates
-    return sorted(list(dates))
+    return result
 
 
-def filter_logs_by_date(date_str: str) -> str:
+def summarize_daily_log(date_str: str) -> Dict[str, Any]:
     """
-    Filter log content by specified date with precise matching
+    Parsed data (see parse_focus_log, including the hour/period histograms) plus
+    the raw log excerpt ("raw_logs") for one date, built in a single pass over
+    that date's records. Cached until records are added for the date.
 
     Args:
         date_str (str): Date string in format YYYY-MM-DD
 
     Returns:
-        str: Log content for the specified date
+        dict: Parsed data with the raw log excerpt; treat as read-only
     """
-    if not os.path.exists(LOG_FILE):
-        return ""
+    store = focus_store.get_store(log_path=LOG_FILE)
+    version = store.version(date_str)
+    with _cache_lock:
+        cached = _summary_cache.get(date_str)
+        if cached is not None and cached[0] == version:
+            _summary_cache.move_to_end(date_str)
+            return cached[1]
+
+    raw_lines = []
+
+    def excerpt(records):
+        for record in records:
+            raw_lines.append(focus_log.format_record(record) + "\n" + LOG_SEPARATOR)
+            yield record
+
+    summary = parse_focus_log(excerpt(store.records(date_str, date_str)), target_date=date_str)
+    summary["raw_logs"] = "\n".join(raw_lines)
+    with _cache_lock:
+        _summary_cache[date_str] = (version, summary)
+        _summary_cache.move_to_end(date_str)
+        while len(_summary_cache) > SUMMARY_CACHE_DAYS:
+            _summary_cache.popitem(last=False)
+    return summary
 
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        content = f.read()
 
-    # Split log into records by separator
-    records = content.split("--------------------------------------------------")
+def get_dates_from_log():
+    """
+    Extract all dates from the log file and return a sorted list of dates
+    """
+    global _dates_cache
+    store = focus_store.get_store(log_path=LOG_FILE)
+    version = store.version()
+    with _cache_lock:
+        if _dates_cache is not None and _dates_cache[0] == version:
+            return list(_dates_cache[1])
+    # Distinct dates straight from the event store's date index
+    dates = store.dates()
+    with _cache_lock:
+        _dates_cache = (version, dates)
+    return list(dates)
 
-    # More accurately filter records containing the specified date
-    date_pattern = r'\[' + date_str + r' \d{2}:\d{2}:\d{2}\]'
-    filtered_records = []
 
-    for record in records:
-        if re.search(date_pattern, record):
-            filtered_records.append(record)
+def filter_logs_by_date(date_str: str) -> str:
+    """
+    Filter log content by specified date with precise matching
 
-    # Recombine filtered records
-    result = ""
-    if filtered_records:
-        result = "--------------------------------------------------".join(filtered_records)
-        # Ensure each record is followed by the separator
-        if not result.endswith("--------------------------------------------------"):
-            result += "--------------------------------------------------"
+    Args:
+        date_str (str): Date string in format YYYY-MM-DD
 
-    return result
+    Returns:
+        str: Log content for the specified date
+    """
+    return summarize_daily_log(date_str)["raw_logs"]
 
 
 def user_select_date():
@@ -387,28 +408,24 @@ def analyze_daily_focus(date_str: str, headless=False):
         date_str (str): Date string in YYYY-MM-DD format
         headless (bool): Whether to run in headless mode (without console output)
     """
-    if not os.path.exists(LOG_FILE):
+    if not os.path.exists(LOG_FILE) and not os.path.exists(focus_store.DB_FILE):
         if not headless:
-            print(f"❌ Error: Log file {LOG_FILE} not found")
+            print(f"❌ Error: Neither log file {LOG_FILE} nor event store {focus_store.DB_FILE} found")
         return None
 
     if not headless:
         print(f"\n🔍 Analyzing focus records for {date_str}...")
 
-    # Read and parse log
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        log_content = f.read()
-
-    # Use the improved parser to get structured data
-    parsed_data = parse_focus_log(log_content, target_date=date_str)
+    # Parsed data and raw excerpt from one pass over the day's records
+    parsed_data = summarize_daily_log(date_str)
 
     if parsed_data["total_entries"] == 0:
         if not headless:
             print(f"❌ No log records found for {date_str}")
         return None
 
-    # Get raw log text for completeness check
-    raw_daily_logs = filter_logs_by_date(date_str)
+    # Raw log text for completeness check
+    raw_daily_logs = parsed_data["raw_logs"]
 
     # Build a more detailed and structured prompt
     prompt = f"""
@@ -431,7 +448,10 @@ def analyze_daily_focus(date_str: str, headless=False):
 3. Distraction reason analysis:
 {format_distraction_reasons(parsed_data["distraction_reasons"])}
 
-4. Raw log records:
+4. Foreground app usage:
+{format_app_usage(parsed_data["app_usage"])}
+
+5. Raw log records:
 {raw_daily_logs}
 
 [Analysis task]:
@@ -476,7 +496,7 @@ Date: {date_str}
 """
 
     try:
-        model_name = "Qwen2.5:7b"  # Or use other available models
+        model_name = llm_client.LLM_MODEL  # Or use other available models
 
         if not headless:
             print(f"\n===== Generating Focus Analysis Report for {date_str} =====\n")
@@ -1,8 +1,10 @@
 import sys
-import json
 import requests
 import os
 from typing import Generator
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import llm_client
 from analysis.weekly_prompt import parse_specific_files, generate_summary_text,generate_prompt
 from datetime import datetime, timedelta
 import glob
@@ -10,37 +12,21 @@ import glob
 # Flag to stop analysis
 analysis_running = False
 
-def ollama_stream_generator(prompt: str, model: str = "Qwen2.5:7b") -> Generator[str, None, None]:
+def ollama_stream_generator(prompt: str, model: str = None) -> Generator[str, None, None]:
     """
     Ollama streaming response generator
     :param prompt: Input prompt text
-    :param model: Model name to use
-    :return: An iterator of generated text results
+    :param model: Model name to use (defaults to llm_client.LLM_MODEL)
+    :return: Iterator of generated text results
     """
-    endpoint = "http://120.26.224.38:11434/api/generate"
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": True,  # Enable streaming output
-        "options": {
-            "temperature": 0.7,  # Controls randomness (0-1)
-            "num_predict": 32768  # Maximum number of generated tokens
-        }
+    options = {
+        "temperature": 0.7,  # Controls randomness (0-1)
+        "num_predict": 32768  # Maximum number of generated tokens
     }
 
     try:
-        with requests.post(endpoint, json=payload, stream=True, timeout=30) as response:
-            response.raise_for_status()  # Check HTTP errors
-
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        chunk = json.loads(line.decode('utf-8'))
-                        yield chunk.get("response", "")
-                    except json.JSONDecodeError:
-                        print(" | [JSON parsing error] ", end="", flush=True)
-                    except Exception as e:
-                        print(f" | [Data parsing error: {str(e)}] ", end="", flush=True)
+        for text in llm_client.stream_generate(prompt, model, options=options, timeout=30):
+            yield text
 
     except requests.exceptions.RequestException as e:
         print(f"\nRequest failed: {str(e)}")
@@ -103,7 +89,7 @@ def analyze_prompt_with_ollama(prompt, headless=False):
     Analyze the prompt using the remote API.
     """
     global analysis_running
-    model = "Qwen2.5:7b"  # Replace with the appropriate model name
+    model = llm_client.LLM_MODEL  # Replace with the appropriate model name
     full_response = []
 
     if not headless:
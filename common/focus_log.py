@@ -0,0 +1,356 @@
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import threading
+from typing import Generator, List, Optional
+
+# Focus log in the record format below, and the free-text log it replaces
+LOG_FILE = "../focus_log.jsonl"
+LEGACY_LOG_FILE = "../focus_log.txt"
+
+# File layout: one header line, then one record per line as "<payload bytes>\t<JSON payload>\n".
+# The length prefix lets readers reject a torn last record without trying to parse it.
+FORMAT_VERSION = 1
+HEADER = f"#duke-focus-log {FORMAT_VERSION}\n".encode("utf-8")
+# fsync after this many appended records or this many seconds, whichever comes first
+FSYNC_EVERY = 16
+FSYNC_INTERVAL = 30
+# Largest slice of the log memory-mapped at once while reading
+MMAP_WINDOW = 64 * 1024 * 1024
+# Seconds a verdict is taken to cover when it does not log an "interval" (older logs
+# were written at a fixed cadence, replayed verdicts have no planned next check)
+DEFAULT_INTERVAL = 300
+
+# How encode_record() starts every payload
+_TIMESTAMP_PREFIX = b'{"timestamp": "'
+# Entry headers of the free-text log; the JSON after a header may span several lines
+_LEGACY_HEADER_PATTERN = re.compile(r'^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] Output: ', re.MULTILINE)
+_LEGACY_JSON_PATTERN = re.compile(r'{.*}', re.DOTALL)
+_LEGACY_SEPARATOR = "-" * 50
+
+
+# ---------------------------
+# Record encoding
+def encode_record(timestamp: str, output: dict) -> bytes:
+    """One record: capture time ("YYYY-MM-DD HH:MM:SS") and the verdict JSON"""
+    payload = json.dumps({"timestamp": timestamp, "output": output}, ensure_ascii=False).encode("utf-8")
+    return str(len(payload)).encode("ascii") + b"\t" + payload + b"\n"
+
+
+def verdict_interval(output: dict) -> float:
+    """
+    Seconds a verdict covers, i.e. the planned delay until the next check. The monitor
+    checks more often after a distraction, so ratios weight verdicts by this, not by count.
+    """
+    interval = output.get("interval")
+    if isinstance(interval, (int, float)) and not isinstance(interval, bool) and interval >= 0:
+        return float(interval)
+    return float(DEFAULT_INTERVAL)
+
+
+def decode_record(line: bytes) -> Optional[dict]:
+    """Decode one record line; None for a torn, corrupt or foreign line"""
+    length, sep, payload = line.rstrip(b"\n").partition(b"\t")
+    if not sep or not length.isdigit() or int(length) != len(payload):
+        return None
+    try:
+        record = json.loads(payload)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if not isinstance(record, dict) or "timestamp" not in record or not isinstance(record.get("output"), dict):
+        return None
+    return record
+
+
+def format_record(record: dict) -> str:
+    """Human-readable form of a record, as the old text log showed it"""
+    return f"[{record['timestamp']}] Output: {json.dumps(record['output'], ensure_ascii=False)}"
+
+
+def check_header(f, path):
+    """Validate the header line of an open binary log file"""
+    header = f.readline()
+    if not header:
+        return  # Empty file: no records yet
+    if not header.startswith(b"#duke-focus-log "):
+        raise ValueError(f"{path} is not a focus record log")
+    version = header.split()[1].decode("ascii", "replace")
+    if version != str(FORMAT_VERSION):
+        raise ValueError(f"Unsupported focus record log version {version} in {path}")
+
+
+# ---------------------------
+# Writer
+class FocusLogWriter:
+    """
+    Append-only writer. Each record is flushed to the OS immediately so readers see
+    it, while fsync is batched (every FSYNC_EVERY records or FSYNC_INTERVAL seconds).
+    Safe to share between threads.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or LOG_FILE
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _open(self):
+        if self._file is None:
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            self._file = open(self.path, "ab")
+            if size == 0:
+                self._file.write(HEADER)
+            else:
+                # Terminate a record torn by a crash, so the next one starts on its own line
+                with open(self.path, "rb") as f:
+                    f.seek(size - 1)
+                    if f.read(1) != b"\n":
+                        self._file.write(b"\n")
+        return self._file
+
+    def append(self, timestamp: str, output: dict):
+        with self._lock:
+            f = self._open()
+            f.write(encode_record(timestamp, output))
+            f.flush()
+            self._unsynced += 1
+            if self._unsynced >= FSYNC_EVERY or time.monotonic() - self._last_sync >= FSYNC_INTERVAL:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None and self._unsynced:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                if self._unsynced:
+                    self._sync()
+                self._file.close()
+                self._file = None
+
+
+# ---------------------------
+# Readers
+def _record_date(line: bytes) -> Optional[str]:
+    """Date of a record line without decoding its whole payload when it is in the writer's layout"""
+    length, sep, payload = line.rstrip(b"\n").partition(b"\t")
+    if not sep or not length.isdigit() or int(length) != len(payload):
+        return None
+    if payload.startswith(_TIMESTAMP_PREFIX):
+        return payload[len(_TIMESTAMP_PREFIX):len(_TIMESTAMP_PREFIX) + 10].decode("ascii", "replace")
+    record = decode_record(line)
+    return record["timestamp"][:10] if record is not None else None
+
+
+def _live_date_at(f, offset, end) -> Optional[str]:
+    """Date of the first live (not replayed) record starting at or after offset; None past the end"""
+    f.seek(offset)
+    while f.tell() < end:
+        record = decode_record(f.readline())
+        if record is not None and not record["output"].get("replayed"):
+            return record["timestamp"][:10]
+    return None
+
+
+def _seek_date(f, data_start, end, date) -> int:
+    """
+    Offset of the first record line at which live records reach date, by binary
+    search. Live records are appended in capture order; replayed snapshots are
+    appended later than their capture time and are skipped while probing.
+    """
+    lo, hi = data_start, end
+    while lo < hi:
+        mid = (lo + hi) // 2
+        f.seek(mid - 1)
+        line_start = mid if mid == data_start else mid - 1 + len(f.readline())
+        probe = _live_date_at(f, line_start, end)
+        if probe is not None and probe < date:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo == data_start:
+        return lo
+    f.seek(lo - 1)
+    return lo - 1 + len(f.readline())
+
+
+def iter_records(path=None, start_date: str = None, end_date: str = None) -> Generator[dict, None, None]:
+    """
+    Yield {"timestamp", "output"} records in file order, optionally limited to
+    start_date <= date <= end_date (YYYY-MM-DD, both inclusive). With start_date,
+    reading starts at that date (binary search, see _seek_date); records outside
+    the range are then skipped by their date prefix, without decoding their JSON.
+    Replayed snapshots of the range logged later are still found, so the scan
+    runs to the end of the log.
+    """
+    path = path or LOG_FILE
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        check_header(f, path)
+        data_start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        if start_date:
+            data_start = _seek_date(f, data_start, size, start_date)
+        for line in _iter_lines(f, data_start, size):
+            if start_date or end_date:
+                date = _record_date(line)
+                if date is None or (start_date and date < start_date) or (end_date and date > end_date):
+                    continue
+            record = decode_record(line)
+            if record is not None:
+                yield record
+
+
+def _iter_lines(f, start, end) -> Generator[bytes, None, None]:
+    """
+    Lines of f between two byte offsets, read through a sliding memory-mapped
+    window: only the requested pages are touched, and at most MMAP_WINDOW bytes
+    are mapped at a time, so memory stays flat however large the log grows.
+    """
+    pos = start
+    while pos < end:
+        base = pos - pos % mmap.ALLOCATIONGRANULARITY
+        length = min(end, pos + MMAP_WINDOW) - base
+        with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ, offset=base) as mm:
+            local = pos - base
+            while local < length:
+                newline = mm.find(b"\n", local)
+                if newline < 0:
+                    if base + length < end and local > pos - base:
+                        break  # The line continues past this window: map the next one from its start
+                    newline = length - 1  # Torn last line (or one longer than a window)
+                yield mm[local:newline + 1]
+                local = newline + 1
+            pos = base + local
+
+
+def read_records(path=None, date: str = None) -> List[dict]:
+    """All records, or the records of one date"""
+    return list(iter_records(path, date, date))
+
+
+def read_last_records(path=None, count: int = 10) -> List[dict]:
+    """The last count records, reading backwards from the end of the file"""
+    path = path or LOG_FILE
+    if count <= 0 or not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        check_header(f, path)
+        data_start = f.tell()
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        block = 64 * 1024
+        while True:
+            start = max(data_start, end - block)
+            f.seek(start)
+            lines = f.read(end - start).split(b"\n")
+            if start > data_start:
+                lines = lines[1:]  # May start mid-record
+            records = [record for record in map(decode_record, lines) if record is not None]
+            if len(records) >= count or start == data_start:
+                return records[-count:]
+            block *= 4
+
+
+# ---------------------------
+# One-shot migration from the free-text log
+def iter_legacy_entries(legacy_path, rejected: list = None) -> Generator[tuple, None, None]:
+    """
+    Yield (timestamp, output dict) from a "[ts] Output: {json}" text log, reading
+    it entry by entry (header up to the next separator) as the old parser did.
+    Entries that cannot be read (e.g. torn by a crash mid-write) are skipped and,
+    when a rejected list is given, appended to it as their raw text.
+    """
+    with open(legacy_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    headers = list(_LEGACY_HEADER_PATTERN.finditer(content))
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(content)
+        body = content[header.end():end].split(_LEGACY_SEPARATOR)[0]
+        match = _LEGACY_JSON_PATTERN.search(body)
+        try:
+            output = json.loads(match.group(0)) if match else None
+        except json.JSONDecodeError:
+            output = None
+        if isinstance(output, dict):
+            yield header.group(1), output
+        elif rejected is not None:
+            rejected.append(header.group(0) + body.strip())
+
+
+def migrate_legacy_log(legacy_path=None, path=None) -> int:
+    """
+    Convert the free-text log into a new record log. Refuses to overwrite an
+    existing record log. Entries that cannot be read are written to
+    "<record log>.rejected" and reported; the legacy log itself is left in place
+    as a backup. Returns the number of migrated entries.
+    """
+    legacy_path = legacy_path or LEGACY_LOG_FILE
+    path = path or LOG_FILE
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        raise FileExistsError(f"{path} already exists")
+    tmp_path = path + ".tmp"
+    count = 0
+    rejected = []
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(HEADER)
+            for timestamp, output in iter_legacy_entries(legacy_path, rejected):
+                out.write(encode_record(timestamp, output))
+                count += 1
+            out.flush()
+            os.fsync(out.fileno())
+    except (OSError, ValueError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if rejected:
+        rejected_path = path + ".rejected"
+        with open(rejected_path, "a", encoding="utf-8") as f:
+            for entry in rejected:
+                f.write(entry + "\n" + _LEGACY_SEPARATOR + "\n")
+        print(f"{len(rejected)} unreadable entries in {legacy_path} were not migrated, see {rejected_path}")
+    os.replace(tmp_path, path)
+    return count
+
+
+def ensure_migrated(path=None, legacy_path=None) -> Optional[int]:
+    """
+    Migrate the legacy text log once, when it exists and the record log does not yet.
+    Never raises: a failed migration is reported and new records are still written
+    (the legacy log stays in place and can be imported with common/focus_store.py).
+    """
+    path = path or LOG_FILE
+    legacy_path = legacy_path or LEGACY_LOG_FILE
+    if os.path.exists(path) or not os.path.exists(legacy_path):
+        return None
+    try:
+        count = migrate_legacy_log(legacy_path, path)
+    except (OSError, ValueError) as e:
+        print(f"Migration of {legacy_path} failed: {e}")
+        return None
+    print(f"Migrated {count} entries from {legacy_path} to {path} (the old log is kept as a backup)")
+    return count
+
+
+if __name__ == "__main__":
+    legacy = sys.argv[1] if len(sys.argv) > 1 else LEGACY_LOG_FILE
+    target = sys.argv[2] if len(sys.argv) > 2 else LOG_FILE
+    try:
+        migrated = migrate_legacy_log(legacy, target)
+    except (OSError, ValueError) as e:
+        print(f"Migration failed: {e}")
+        sys.exit(1)
+    print(f"Migrated {migrated} entries from {legacy} to {target}")
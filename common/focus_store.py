@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List
+
+if __package__:
+    from . import focus_log
+else:
+    import focus_log
+
+# SQLite database with one row per focus verdict, queried by the fatigue and analysis modules
+DB_FILE = "../focus_events.db"
+
+# Bumped on schema changes; the store is derived from the record log, so an
+# outdated database is dropped and rebuilt by the next sync
+SCHEMA_VERSION = 3
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    reason TEXT,
+    source TEXT,
+    interval REAL NOT NULL,
+    output TEXT NOT NULL,
+    entry_hash BLOB NOT NULL UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_events_date ON events (date, status, interval);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _row(timestamp: str, output: dict) -> tuple:
+    payload = json.dumps(output, ensure_ascii=False)
+    # Dedupe key: a digest of the entry rather than a second copy of its JSON in an index
+    entry_hash = hashlib.sha1(f"{timestamp}\t{payload}".encode("utf-8")).digest()
+    return (timestamp, timestamp[:10], output.get("status", ""), output.get("reason"), output.get("source"),
+            focus_log.verdict_interval(output), payload, entry_hash)
+
+
+class FocusStore:
+    """
+    Focus verdicts in SQLite (WAL mode, so readers never block the monitor's writes).
+    Records come back in the same {"timestamp", "output"} shape as common/focus_log.py.
+    Entries are unique by a hash of (timestamp, output), so imports can be repeated safely.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DB_FILE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._conn.executescript("DROP TABLE IF EXISTS events; DROP TABLE IF EXISTS meta;")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---------------------------
+    # Writes
+    def add(self, timestamp: str, output: dict):
+        self.add_many([(timestamp, output)])
+
+    def add_many(self, entries) -> int:
+        """Insert (timestamp, output) pairs, skipping ones already stored; returns the number inserted"""
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO events (timestamp, date, status, reason, source, interval, output, entry_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (_row(timestamp, output) for timestamp, output in entries))
+            return self._conn.total_changes - before
+
+    # ---------------------------
+    # Queries
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def records(self, start_date: str = None, end_date: str = None) -> List[Dict]:
+        """Records with start_date <= date <= end_date (inclusive), in time order"""
+        conditions, params = [], []
+        if start_date:
+            conditions.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("date <= ?")
+            params.append(end_date)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        rows = self._query(f"SELECT timestamp, output FROM events {where}ORDER BY timestamp, id", params)
+        return [{"timestamp": timestamp, "output": json.loads(output)} for timestamp, output in rows]
+
+    def last_records(self, count: int = 10) -> List[Dict]:
+        """The last count records, oldest first"""
+        rows = self._query("SELECT timestamp, output FROM events ORDER BY timestamp DESC, id DESC LIMIT ?",
+                           (count,))
+        return [{"timestamp": timestamp, "output": json.loads(output)} for timestamp, output in reversed(rows)]
+
+    def version(self, date: str = None) -> tuple:
+        """
+        Changes whenever records are added (for one date, or at all). Rows are never
+        deleted and ignored duplicates take no id, so the count and highest id suffice.
+        """
+        if date:
+            return tuple(self._query("SELECT COUNT(*), MAX(id) FROM events WHERE date = ?", (date,))[0])
+        return tuple(self._query("SELECT MAX(id) FROM events")[0])
+
+    def dates(self) -> List[str]:
+        return [date for (date,) in self._query("SELECT DISTINCT date FROM events ORDER BY date")]
+
+    def daily_counts(self, start_date: str = None, end_date: str = None) -> Dict[str, Dict[str, float]]:
+        """
+        {date: {"total": n, "distracted": n, "seconds": s, "distracted_seconds": s}}, where
+        seconds sum the interval each verdict covers. Answered from the (date, status, interval) index alone.
+        """
+        rows = self._query(
+            "SELECT date, COUNT(*), SUM(status LIKE '2%'), SUM(interval), "
+            "SUM(CASE WHEN status LIKE '2%' THEN interval ELSE 0 END) FROM events "
+            "WHERE date >= ? AND date <= ? GROUP BY date ORDER BY date",
+            (start_date or "0000-00-00", end_date or "9999-99-99"))
+        return {date: {"total": total, "distracted": distracted or 0,
+                       "seconds": seconds or 0.0, "distracted_seconds": distracted_seconds or 0.0}
+                for date, total, distracted, seconds, distracted_seconds in rows}
+
+    # ---------------------------
+    # Importers
+    def sync_from_log(self, log_path=None) -> int:
+        """
+        Import the part of the record log appended since the last sync (tracked as a
+        byte offset in the meta table). Returns the number of new entries.
+        """
+        log_path = log_path or focus_log.LOG_FILE
+        if not os.path.exists(log_path):
+            return 0
+        key = "log_offset:" + os.path.abspath(log_path)
+        row = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        offset = int(row[0][0]) if row else 0
+        size = os.path.getsize(log_path)
+        if size < offset:
+            offset = 0  # The log was replaced: re-import it, duplicates are ignored
+        if size == offset:
+            return 0
+        entries = []
+        with open(log_path, "rb") as f:
+            if offset == 0:
+                focus_log.check_header(f, log_path)
+                offset = f.tell()
+            else:
+                f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Record still being written
+                offset += len(line)
+                record = focus_log.decode_record(line)
+                if record is not None:
+                    entries.append((record["timestamp"], record["output"]))
+        inserted = self.add_many(entries)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(offset)))
+        return inserted
+
+    def import_legacy_log(self, legacy_path=None) -> int:
+        """Import a free-text "[ts] Output: {json}" log; returns the number of new entries"""
+        legacy_path = legacy_path or focus_log.LEGACY_LOG_FILE
+        rejected = []
+        inserted = self.add_many(focus_log.iter_legacy_entries(legacy_path, rejected))
+        if rejected:
+            print(f"Skipped {len(rejected)} unreadable entries in {legacy_path}")
+        return inserted
+
+
+def get_store(path=None, log_path=None) -> FocusStore:
+    """
+    Shared store for a database path. Each call first migrates an old free-text
+    log (once) and imports whatever the record log gained since the last call,
+    so the store also covers entries written while the monitor ran without it.
+    A failed migration or sync is reported and the store is served as it is.
+    """
+    path = path or DB_FILE
+    log_path = log_path or focus_log.LOG_FILE
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = FocusStore(path)
+        if log_path == focus_log.LOG_FILE:
+            try:
+                focus_log.ensure_migrated(log_path)
+            except (OSError, ValueError) as e:
+                print(f"Legacy log migration failed: {e}")
+    try:
+        store.sync_from_log(log_path)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Focus log sync failed: {e}")
+    return store
+
+
+if __name__ == "__main__":
+    legacy = sys.argv[1] if len(sys.argv) > 1 else focus_log.LEGACY_LOG_FILE
+    target = sys.argv[2] if len(sys.argv) > 2 else DB_FILE
+    try:
+        imported = FocusStore(target).import_legacy_log(legacy)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Import failed: {e}")
+        sys.exit(1)
+    print(f"Imported {imported} new entries from {legacy} into {target}")
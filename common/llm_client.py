@@ -0,0 +1,201 @@
+import os
+import json
+import asyncio
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Generator, AsyncGenerator, Optional
+
+# Ollama-compatible server and default model (override with DUKE_LLM_ENDPOINT / DUKE_LLM_MODEL)
+LLM_ENDPOINT = os.environ.get("DUKE_LLM_ENDPOINT", "http://120.26.224.38:11434")
+LLM_MODEL = os.environ.get("DUKE_LLM_MODEL", "Qwen2.5:7b")
+# Default timeout (seconds) for connecting and for each read
+DEFAULT_TIMEOUT = 30
+# Keep-alive connections kept open to the server
+POOL_SIZE = 8
+
+_session = None
+_session_lock = threading.Lock()
+
+
+# ---------------------------
+# Shared keep-alive session
+def get_session() -> requests.Session:
+    """Return the process-wide session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def close_session():
+    """Close all pooled connections"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _post(path: str, payload: dict, stream: bool, timeout: Optional[float]):
+    response = get_session().post(f"{LLM_ENDPOINT}{path}", json=payload, stream=stream,
+                                  timeout=timeout or DEFAULT_TIMEOUT)
+    response.raise_for_status()  # Check HTTP errors
+    return response
+
+
+def _iter_json_lines(response) -> Generator[dict, None, None]:
+    """Parse a newline-delimited JSON stream, skipping malformed lines"""
+    for line in response.iter_lines():
+        if not line:
+            continue
+        try:
+            yield json.loads(line.decode('utf-8'))
+        except json.JSONDecodeError:
+            print(" | [JSON parsing error] ", end="", flush=True)
+
+
+# ---------------------------
+# Synchronous API (raises requests.exceptions.RequestException on failure)
+def chat(messages: List[Dict[str, str]], model: str = None, options: dict = None,
+         timeout: float = None, **extra) -> str:
+    """
+    Non-streaming chat call
+    :param messages: List of chat messages
+    :param model: Model name (defaults to LLM_MODEL)
+    :param options: Model options, e.g. {"temperature": 0.7}
+    :param timeout: Timeout in seconds (defaults to DEFAULT_TIMEOUT)
+    :return: Model response content
+    """
+    payload = {"model": model or LLM_MODEL, "messages": messages, "stream": False,
+               "options": options or {}, **extra}
+    with _post("/api/chat", payload, stream=False, timeout=timeout) as response:
+        return response.json().get("message", {}).get("content", "")
+
+
+def stream_chat(messages: List[Dict[str, str]], model: str = None, options: dict = None,
+                timeout: float = None, **extra) -> Generator[str, None, None]:
+    """Streaming chat call, yields content chunks as they arrive"""
+    payload = {"model": model or LLM_MODEL, "messages": messages, "stream": True,
+               "options": options or {}, **extra}
+    with _post("/api/chat", payload, stream=True, timeout=timeout) as response:
+        for chunk in _iter_json_lines(response):
+            # Compatible with different Ollama versions
+            if "message" in chunk and "content" in chunk["message"]:
+                yield chunk["message"]["content"]
+            elif "content" in chunk:
+                yield chunk["content"]
+
+
+def stream_generate(prompt: str, model: str = None, options: dict = None,
+                    timeout: float = None, **extra) -> Generator[str, None, None]:
+    """Streaming completion call (/api/generate), yields response chunks as they arrive"""
+    payload = {"model": model or LLM_MODEL, "prompt": prompt, "stream": True,
+               "options": options or {}, **extra}
+    with _post("/api/generate", payload, stream=True, timeout=timeout) as response:
+        for chunk in _iter_json_lines(response):
+            yield chunk.get("response", "")
+
+
+def read_first_json(chunks) -> tuple:
+    """
+    Consume streamed text chunks until the first complete top-level JSON object or
+    array has arrived, then stop reading (closing the stream and its connection).
+    A leading <think>...</think> reasoning block is skipped.
+    :return: (parsed value, raw text read so far)
+    :raises ValueError: when the balanced text is not valid JSON or the stream ends first
+    """
+    text = ""
+    pos = 0
+    start = None
+    depth = 0
+    in_string = escape = False
+    try:
+        for chunk in chunks:
+            text += chunk
+            if start is None:
+                stripped = text.lstrip()
+                if stripped.startswith("<think>"):
+                    end = text.find("</think>")
+                    if end < 0:
+                        continue
+                    pos = max(pos, end + len("</think>"))
+                elif "<think>".startswith(stripped):
+                    continue  # Could still be the start of a reasoning block
+            while pos < len(text):
+                ch = text[pos]
+                pos += 1
+                if start is None:
+                    if ch in "{[":
+                        start, depth = pos - 1, 1
+                    continue
+                if in_string:
+                    if escape:
+                        escape = False
+                    elif ch == "\\":
+                        escape = True
+                    elif ch == '"':
+                        in_string = False
+                elif ch == '"':
+                    in_string = True
+                elif ch in "{[":
+                    depth += 1
+                elif ch in "}]":
+                    depth -= 1
+                    if depth == 0:
+                        try:
+                            return json.loads(text[start:pos]), text
+                        except json.JSONDecodeError as e:
+                            raise ValueError(f"{e} (raw output: {text[start:pos]})")
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+    raise ValueError(f"Stream ended before a complete JSON value (raw output: {text.strip()})")
+
+
+# ---------------------------
+# Asynchronous API: the same pooled session, driven from worker threads
+async def achat(messages: List[Dict[str, str]], model: str = None, options: dict = None,
+                timeout: float = None, **extra) -> str:
+    return await asyncio.to_thread(chat, messages, model, options, timeout, **extra)
+
+
+async def _astream(generator_func, *args, **kwargs) -> AsyncGenerator[str, None]:
+    """Run a blocking streaming generator in a thread and hand its chunks to the event loop"""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+
+    def produce():
+        try:
+            for chunk in generator_func(*args, **kwargs):
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+
+    producer = loop.run_in_executor(None, produce)
+    while True:
+        item = await queue.get()
+        if item is done:
+            break
+        if isinstance(item, Exception):
+            raise item
+        yield item
+    await producer
+
+
+def astream_chat(messages: List[Dict[str, str]], model: str = None, options: dict = None,
+                 timeout: float = None, **extra) -> AsyncGenerator[str, None]:
+    return _astream(stream_chat, messages, model, options, timeout, **extra)
+
+
+def astream_generate(prompt: str, model: str = None, options: dict = None,
+                     timeout: float = None, **extra) -> AsyncGenerator[str, None]:
+    return _astream(stream_generate, prompt, model, options, timeout, **extra)
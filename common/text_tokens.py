@@ -0,0 +1,16 @@
+import re
+
+
+def tokenize(text):
+    """
+    Lower-cased latin words plus CJK character bigrams. Shared by the prompt
+    builder (goal relevance, noise detection) and the local classifier's features;
+    changing it changes both, and the classifier has to be retrained.
+    """
+    text = (text or "").lower()
+    tokens = re.findall(r"[a-z][a-z0-9_+#.-]{1,}", text)
+    for run in re.findall(r"[一-鿿]+", text):
+        if len(run) == 1:
+            tokens.append(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
@@ -1,26 +1,42 @@
+import os
 import re
-import json
+import sys
 from datetime import datetime
 from collections import Counter
-import requests
 
-def read_focus_log(file_path):
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import llm_client
+from common import focus_log
+from common import focus_store
+
+def read_focus_log(file_path=None, start_date=None, end_date=None):
+    """
+    Focus log entries (verdict dict + parsed 'timestamp'), optionally limited to
+    start_date <= date <= end_date (YYYY-MM-DD). Reads the indexed event store
+    unless a specific log file is given.
+    """
     logs = []
-    pattern = re.compile(r'\[(.*?)\] Output: ({.*?})')
-    with open(file_path, "r", encoding='utf-8') as f:
-        for line in f:
-            match = pattern.match(line.strip())
-            if not match:
-                continue
-            ts_str, json_str = match.groups()
-            try:
-                log_dict = json.loads(json_str)
-                log_dict['timestamp'] = datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
-                logs.append(log_dict)
-            except Exception as e:
-                pass
+    if file_path is None:
+        records = focus_store.get_store().records(start_date, end_date)
+    else:
+        records = focus_log.iter_records(file_path, start_date, end_date)
+    for record in records:
+        try:
+            log_dict = dict(record["output"])
+            log_dict['timestamp'] = datetime.strptime(record["timestamp"], "%Y-%m-%d %H:%M:%S")
+            logs.append(log_dict)
+        except Exception as e:
+            pass
     return logs
 
+def read_daily_counts(start_date=None, end_date=None):
+    """
+    {date: {"total": n, "distracted": n, "seconds": s, "distracted_seconds": s}} per
+    day from the event store, for aggregations that need only the counts and the
+    seconds the verdicts cover (e.g. historical fatigue scores)
+    """
+    return focus_store.get_store().daily_counts(start_date, end_date)
+
 def filter_today_logs(logs, ref_date=None):
     if not ref_date:
         ref_date = datetime.now()
@@ -33,8 +49,14 @@ def compute_fatigue_score(logs):
         return 0, 0, 0
     total = len(logs)
     distraction = sum(1 for log in logs if log['status'].startswith("2"))
-    fatigue_score = distraction / total * 100
-    return fatigue_score, distraction, total
+    # Score by the time each verdict covers: checks come faster after a distraction
+    seconds = sum(focus_log.verdict_interval(log) for log in logs)
+    distracted_seconds = sum(focus_log.verdict_interval(log) for log in logs if log['status'].startswith("2"))
+    return score_from_counts(distracted_seconds, seconds), distraction, total
+
+def score_from_counts(distraction, total):
+    """Distraction rate in percent, from verdict counts or (preferably) the seconds they cover"""
+    return distraction / total * 100 if total else 0
 
 def extract_main_distraction_reasons(logs, topn=2):
     reasons = []
@@ -88,37 +110,13 @@ def generate_intervention_report(level, fatigue_score, distraction_reasons):
         f"Main distraction triggers: {reasons_str}\n"
     )
 
-    data = {
-        "model": "Qwen2.5:7b",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-    }
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
 
     try:
-        response = requests.post(
-            "http://120.26.224.38:11434/api/chat",
-            json=data,
-            stream=True,       # <- use stream=True!
-            timeout=30
-        )
-        response.raise_for_status()
-        contents = []
-        for line in response.iter_lines():
-            if not line:
-                continue
-            try:
-                obj = json.loads(line.decode('utf-8'))
-                # Ollama new version output: data/message part
-                # Compatible with different formats
-                if "message" in obj and "content" in obj["message"]:
-                    contents.append(obj["message"]["content"])
-                elif "content" in obj:
-                    contents.append(obj["content"])
-            except Exception as e:
-                continue
-        final_text = "".join(contents).strip()
+        final_text = "".join(llm_client.stream_chat(messages, timeout=30)).strip()
         if final_text:
             return final_text
         else:
@@ -127,9 +125,9 @@ def generate_intervention_report(level, fatigue_score, distraction_reasons):
         return f"Intelligent report generation failed: {str(e)}"
 
 def focus_fatigue_calculator():
-    file_path = "../focus_log.txt"  # Or adjust via parameter
-    # 1. Read logs
-    logs = read_focus_log(file_path)
+    today = datetime.now().strftime('%Y-%m-%d')
+    # 1. Read today's logs
+    logs = read_focus_log(start_date=today, end_date=today)
 
     today_logs = filter_today_logs(logs)
     fatigue_score, n_distraction, n_total = compute_fatigue_score(today_logs)
@@ -0,0 +1,109 @@
+import re
+import sys
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import focus_monitor
+from common import llm_client
+
+# Simulated server costs: fixed per-request overhead, prompt prefill and token generation
+MOCK_REQUEST_OVERHEAD = 0.25
+MOCK_PREFILL_PER_1K_TOKENS = 0.4
+MOCK_SECONDS_PER_OUTPUT_TOKEN = 0.02
+# Share of batch items the mock answers with a wrong index, to exercise split-and-retry
+MOCK_ITEM_ERROR_RATE = 0.05
+
+_SNAPSHOT_PATTERN = re.compile(r"Snapshot (\d+) \(captured ([^)]+)\)")
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    """Streams focus verdicts for /api/chat, timed like a small local model"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        prompt = "".join(message["content"] for message in payload["messages"])
+        snapshots = _SNAPSHOT_PATTERN.findall(prompt)
+        if snapshots:
+            items = []
+            for index, captured in snapshots:
+                index = int(index)
+                if random.random() < MOCK_ITEM_ERROR_RATE:
+                    index += len(snapshots)
+                items.append({"index": index, "captured": captured, "status": "1. Focused"})
+            output = json.dumps({"verdicts": items})
+        else:
+            output = json.dumps({"status": "1. Focused"})
+
+        time.sleep(MOCK_REQUEST_OVERHEAD + len(prompt) / 4 / 1000 * MOCK_PREFILL_PER_1K_TOKENS)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        # Roughly four characters per token
+        for i in range(0, len(output), 4):
+            time.sleep(MOCK_SECONDS_PER_OUTPUT_TOKEN)
+            chunk = {"message": {"role": "assistant", "content": output[i:i + 4]}, "done": False}
+            try:
+                self.wfile.write((json.dumps(chunk) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return  # The client stopped reading once the JSON was complete
+        self.wfile.write((json.dumps({"done": True}) + "\n").encode("utf-8"))
+
+
+def start_mock_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_snapshots(count, seed=0):
+    """Synthetic spooled snapshots with a few hundred tokens of screen text each"""
+    rng = random.Random(seed)
+    words = ("python focus monitor verdict classifier screenshot window model prompt budget "
+             "browser video playlist chat message terminal build commit review").split()
+    snapshots = []
+    for i in range(count):
+        lines = [" ".join(rng.choice(words) for _ in range(8)) for _ in range(40)]
+        snapshots.append({
+            "timestamp": f"2026-01-01 {9 + i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+            "goal": "Write the focus classifier",
+            "screen": "\n".join(lines),
+            "windows": ["focus_monitor.py - DuKe - Visual Studio Code", "Chrome"],
+            "foreground": "focus_monitor.py - DuKe - Visual Studio Code",
+        })
+    return snapshots
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 48
+    batch_sizes = [int(size) for size in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1, 2, 4, 8, 16]
+
+    server = start_mock_server()
+    llm_client.LLM_ENDPOINT = f"http://127.0.0.1:{server.server_address[1]}"
+    snapshots = make_snapshots(count)
+    print(f"Classifying {count} snapshots against a mock server at {llm_client.LLM_ENDPOINT}")
+    print("-" * 60)
+    print(f"{'batch size':>10s} {'total':>10s} {'snapshots/s':>12s} {'speed-up':>10s} {'classified':>11s}")
+    baseline = None
+    try:
+        for batch_size in batch_sizes:
+            focus_monitor.BATCH_SIZE = batch_size
+            start = time.perf_counter()
+            results = focus_monitor.classify_batch(snapshots)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            classified = sum(1 for verdict, _ in results if verdict is not None)
+            print(f"{batch_size:10d} {elapsed:8.2f} s {count / elapsed:12.2f} {baseline / elapsed:9.2f}x "
+                  f"{classified:6d}/{count}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import os
+import sys
+import glob
+import time
+import statistics
+from PIL import Image
+
+import ocr_backends
+
+
+def load_sample_images(folder):
+    """Load all PNG/JPG screenshots from a folder into memory"""
+    paths = sorted(glob.glob(os.path.join(folder, "*.png")) + glob.glob(os.path.join(folder, "*.jpg")))
+    images = []
+    for path in paths:
+        img = Image.open(path)
+        img.load()
+        images.append(img.convert("RGB"))
+    return images
+
+
+def benchmark_backend(backend, images, rounds=3):
+    """Run every image through the backend and return the per-image latencies in seconds"""
+    # Warm-up call so engine start-up is not counted against the first image
+    backend.image_to_string(images[0])
+    latencies = []
+    for _ in range(rounds):
+        for img in images:
+            start = time.perf_counter()
+            backend.image_to_string(img)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else "screenshots"
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    images = load_sample_images(folder)
+    if not images:
+        print(f"No sample screenshots found in {folder}")
+        return
+
+    print(f"Benchmarking OCR backends on {len(images)} images x {rounds} rounds")
+    print("-" * 50)
+    for name in ("pytesseract", "tesserocr"):
+        try:
+            backend = ocr_backends.create_ocr_backend(name)
+        except Exception as e:
+            print(f"{name:12s} unavailable: {e}")
+            continue
+        try:
+            latencies = benchmark_backend(backend, images, rounds)
+        finally:
+            backend.close()
+        print(f"{name:12s} mean {statistics.mean(latencies) * 1000:8.1f} ms  "
+              f"median {statistics.median(latencies) * 1000:8.1f} ms  "
+              f"max {max(latencies) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
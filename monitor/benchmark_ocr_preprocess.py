@@ -0,0 +1,61 @@
+import sys
+import time
+import difflib
+
+import ocr_backends
+import ocr_preprocess
+from benchmark_ocr_backends import load_sample_images
+
+
+def char_similarity(reference, text):
+    """Character-level similarity (0-1) between two OCR outputs"""
+    if not reference and not text:
+        return 1.0
+    return difflib.SequenceMatcher(None, reference, text, autojunk=False).ratio()
+
+
+def run_preset(backend, img, preset):
+    """Preprocess and OCR one image, returning (text, seconds)"""
+    start = time.perf_counter()
+    processed = ocr_preprocess.preprocess(img, preset)
+    text = backend.image_to_string(processed).strip() if processed is not None else ""
+    return text, time.perf_counter() - start
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else "screenshots"
+    backend_name = sys.argv[2] if len(sys.argv) > 2 else "auto"
+    images = load_sample_images(folder)
+    if not images:
+        print(f"No sample screenshots found in {folder}")
+        return
+
+    backend = ocr_backends.create_ocr_backend(backend_name)
+    print(f"Benchmarking preprocessing presets on {len(images)} images with {backend.name}")
+    try:
+        # Reference output: the unprocessed screenshot
+        references = []
+        reference_time = 0.0
+        for img in images:
+            text, seconds = run_preset(backend, img, "none")
+            references.append(text)
+            reference_time += seconds
+
+        print("-" * 60)
+        print(f"{'preset':16s} {'mean time':>12s} {'speed-up':>10s} {'similarity':>12s}")
+        for preset in ocr_preprocess.PREPROCESS_PRESETS:
+            total_time = 0.0
+            similarities = []
+            for img, reference in zip(images, references):
+                text, seconds = run_preset(backend, img, preset)
+                total_time += seconds
+                similarities.append(char_similarity(reference, text))
+            print(f"{preset:16s} {total_time / len(images) * 1000:9.1f} ms "
+                  f"{reference_time / total_time if total_time else 0:9.2f}x "
+                  f"{sum(similarities) / len(similarities) * 100:11.1f}%")
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
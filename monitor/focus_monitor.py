@@ -1,53 +1,200 @@
 import os
+import sys
 import time
 import re
 import json
+import asyncio
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import mss
 import mss.tools
-import pytesseract
-from PIL import Image
-import win32gui
-import requests
-import tkinter as tk
-from tkinter import messagebox
-from typing import List, Dict, Generator
-
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-# Log file path
-LOG_FILE = "../focus_log.txt"
+from PIL import Image, ImageDraw
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import llm_client
+from common import focus_log
+from common import focus_store
+import ocr_backends
+import ocr_tiles
+import ocr_preprocess
+import verdict_cache
+import interventions
+import local_classifier
+import offline_spool
+import prompt_builder
+import scheduler
+import window_sampler
+import window_sources
+
+# Log file path (record format, see common/focus_log.py)
+LOG_FILE = focus_log.LOG_FILE
+# Also write verdicts to the SQLite event store the fatigue and analysis modules query
+FOCUS_STORE = True
 # Default whitelist and blacklist
 WHITE_LIST = []
 BLACK_LIST = []
-# Flag to stop monitoring
-stop_monitoring = False
+# Initial seconds between screenshots; the adaptive scheduler (scheduler.py) then
+# shortens it after state changes and backs off while verdicts are stable
+CHECK_INTERVAL = 300
+# Sample foreground/visible windows every few seconds and trigger a check when the mix changes
+WINDOW_SAMPLING = True
+# Window source: "auto", "windows", "x11" or "fake" (in-memory, for CI and benchmarks)
+WINDOW_SOURCE = "auto"
+_window_source = None
+# Check as soon as the foreground window changes (debounced) instead of only on the timer
+FOREGROUND_EVENTS = True
+# Seconds the foreground must stay put after a change before the check is triggered
+FOREGROUND_DEBOUNCE = 3
+# Capacity of the queues between pipeline stages (capture waits when OCR falls behind)
+PIPELINE_QUEUE_SIZE = 2
+# Event loop and task of the running monitor, used by stop_monitor()
+_monitor_loop = None
+_monitor_task = None
+# Held by run_monitor() until its cleanup is done, so a new run never shares (or has closed
+# under it) the previous run's dispatcher, log writer and OCR pool
+_run_lock = threading.Lock()
+# Frame change detection: a snapshot counts as unchanged when fewer than this
+# fraction of hash blocks moved by more than FRAME_BLOCK_DELTA grey levels
+FRAME_HASH_SIZE = (32, 32)
+FRAME_BLOCK_DELTA = 8
+FRAME_CHANGE_THRESHOLD = 0.02
+# Force a full OCR + model check after this many consecutive skipped snapshots
+MAX_CONSECUTIVE_SKIPS = 6
+# Counters for how many OCR and model calls frame change detection saves
+frame_change_stats = {"checks": 0, "skipped": 0}
+# Capture mode: "memory" hands the raw mss buffer straight to PIL and OCR,
+# "file" writes a PNG first and OCR reopens it, "fake" renders the window source's
+# foreground title and window list instead of grabbing a display (CI and benchmarks,
+# together with WINDOW_SOURCE = "fake")
+CAPTURE_MODE = "memory"
+FAKE_SCREEN_SIZE = (1280, 720)
+# In memory mode, whether screenshots are still written to disk (in the background)
+SAVE_SCREENSHOTS = True
+SCREENSHOT_FOLDER = "screenshots"
+# Single background worker that encodes and saves screenshots off the hot path
+_screenshot_writer = ThreadPoolExecutor(max_workers=1)
+# OCR backend: "auto" (warm tesserocr engine pool, falling back to pytesseract),
+# "tesserocr" or "pytesseract"
+OCR_BACKEND = "auto"
+_ocr_backend = None
+# Tile-level OCR cache: only re-run OCR on grid tiles whose content changed
+OCR_TILE_CACHE = True
+_tile_cache = ocr_tiles.TileOCRCache()
+# How the screen is split for OCR: "bands" (full-width bands cut at blank rows, so text
+# lines stay whole and in reading order), "grid" (OCR_TILE_GRID, cuts through lines), "none",
+# or "auto": bands with the warm tesserocr engines, none with pytesseract, which starts a
+# tesseract process and reloads the language data for every tile
+OCR_TILE_STRATEGY = "auto"
+# OCR every physical monitor separately (tiles are merged left to right)
+OCR_SPLIT_MONITORS = True
+# Number of OCR worker processes; 1 runs OCR in the monitor process. None picks half the
+# CPUs (up to 4) with tesserocr and 1 with pytesseract, whose calls are separate processes anyway
+OCR_WORKERS = None
+_ocr_pool = None
+# Image preprocessing preset applied to each tile before OCR (see ocr_preprocess.PREPROCESS_PRESETS,
+# compare presets with benchmark_ocr_preprocess.py)
+OCR_PREPROCESS_PRESET = "none"
+# Reuse model verdicts for similar goal + screen text + window snapshots (see verdict_cache.py)
+VERDICT_CACHE = True
+_verdict_cache = verdict_cache.VerdictCache()
+# Local classifier distilled from past model verdicts (train with train_local_classifier.py);
+# the remote model is only called when its confidence is below LOCAL_CLASSIFIER_THRESHOLD
+LOCAL_CLASSIFIER = True
+LOCAL_CLASSIFIER_THRESHOLD = local_classifier.LOCAL_CLASSIFIER_THRESHOLD
+_local_classifier = None
+_local_classifier_loaded = False
+# Record OCR/window features of each snapshot so the local classifier can be (re)trained
+RECORD_FEATURES = True
+# Classification calls request JSON-constrained output capped at this many tokens; the
+# response is streamed and the connection closed as soon as the verdict object is complete
+CLASSIFY_NUM_PREDICT = 128
+# Compact the OCR text and window titles (dedupe, drop noise and UI chrome, rank by relevance
+# to the goal) to an estimated token budget before building the classification prompt
+COMPACT_PROMPT = True
+PROMPT_TOKEN_BUDGET = prompt_builder.PROMPT_TOKEN_BUDGET
+_prompt_builder = prompt_builder.PromptBuilder()
+# Delta prompting: send the previous model verdict plus only the screen lines added/removed
+# since that check; a full snapshot is sent every DELTA_FULL_EVERY model calls or when
+# more than DELTA_MAX_RATIO of the previous lines changed
+DELTA_PROMPT = True
+DELTA_FULL_EVERY = 5
+DELTA_MAX_RATIO = 0.5
+# Immediate retries when the model output is not a usable verdict (instead of waiting for the next check)
+CLASSIFY_RETRIES = 2
+# Where distraction alerts go: "popup" (desktop), "websocket" (web UI) and/or "log";
+# None picks popup + log, or websocket + log when running headless under the web backend
+INTERVENTION_SINKS = None
+_intervention_dispatcher = None
+# Snapshots packed into one model request when classifying in bulk (spool replay, backfills)
+BATCH_SIZE = 8
+# Spool snapshots to disk while the model endpoint is unreachable and replay them
+# (logged with their original timestamps) once it is back, see offline_spool.py
+OFFLINE_SPOOL = True
+
+_log_writer = None
 
 # ---------------------------
-# Initialize log file (create if not exists)
-if not os.path.exists(LOG_FILE):
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        f.write("Focus Monitoring Log\n")
-        f.write("=" * 50 + "\n\n")
+# Focus log
+def get_log_writer():
+    """Open the focus log on first use, migrating an old free-text log once (best effort)"""
+    global _log_writer
+    if _log_writer is None or _log_writer.path != LOG_FILE:
+        if LOG_FILE == focus_log.LOG_FILE:
+            focus_log.ensure_migrated(LOG_FILE)
+        _log_writer = focus_log.FocusLogWriter(LOG_FILE)
+    return _log_writer
+
+
+def close_log_writer():
+    global _log_writer
+    if _log_writer is not None:
+        _log_writer.close()
+        _log_writer = None
+
 
 def log_json_output(timestamp, json_output):
     """
-    Record user's focus status log: time + model JSON output
+    Record user's focus status log: time + JSON verdict (tagged with its source)
     """
-    with open(LOG_FILE, "a", encoding="utf-8") as log:
-        log.write(f"[{timestamp}] Output: {json_output}\n")
-        log.write("-" * 50 + "\n\n")
+    get_log_writer().append(timestamp, json_output)
+    if FOCUS_STORE:
+        try:
+            focus_store.get_store(log_path=LOG_FILE).add(timestamp, json_output)
+        except Exception as e:
+            print(f"Failed to write verdict to the event store: {e}")
 
 # ---------------------------
 # Screenshot section: using mss
 def capture_screenshot():
-    """Capture the current screen and save to a specified folder"""
-    SCREENSHOT_FOLDER = "screenshots"
+    """
+    Capture the current screen.
+    In "memory" mode returns a PIL image built directly from the mss buffer and
+    optionally saves it in the background; in "file" mode saves a PNG and returns its path;
+    in "fake" mode returns a rendered image, see capture_fake_screenshot.
+    """
+    if CAPTURE_MODE == "fake":
+        return capture_fake_screenshot()
     try:
-        if not os.path.exists(SCREENSHOT_FOLDER):
-            os.makedirs(SCREENSHOT_FOLDER)
-        screenshot_path = os.path.join(SCREENSHOT_FOLDER, f"screenshot_{int(time.time())}.png")
         with mss.mss() as sct:
             monitor = sct.monitors[0]
             sct_img = sct.grab(monitor)
+            if CAPTURE_MODE == "memory":
+                # Decode the BGRA buffer in place, no PNG encode/decode round-trip
+                img = Image.frombuffer("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX", 0, 1)
+                # Remember where each physical monitor sits in the composite for per-monitor OCR
+                img.info["monitors"] = [
+                    (m["left"] - monitor["left"], m["top"] - monitor["top"],
+                     m["left"] - monitor["left"] + m["width"], m["top"] - monitor["top"] + m["height"])
+                    for m in sct.monitors[1:]
+                ]
+                if SAVE_SCREENSHOTS:
+                    _screenshot_writer.submit(save_screenshot, img)
+                return img
+            if not os.path.exists(SCREENSHOT_FOLDER):
+                os.makedirs(SCREENSHOT_FOLDER)
+            screenshot_path = os.path.join(SCREENSHOT_FOLDER, f"screenshot_{int(time.time())}.png")
             mss.tools.to_png(sct_img.rgb, sct_img.size, output=screenshot_path)
         print(f"Screenshot saved: {screenshot_path}")
         return screenshot_path
@@ -55,47 +202,227 @@ def capture_screenshot():
         print(f"Screenshot failed: {e}")
         return None
 
-# ---------------------------
-# OCR recognition function (using pytesseract)
-def ocr_screen_content(screenshot_path):
+
+def capture_fake_screenshot():
+    """
+    Render the window source's foreground title and window list as a screenshot, so the
+    pipeline (frame change detection, OCR, classification) runs without a display.
+    """
     try:
-        img = Image.open(screenshot_path)
-        text = pytesseract.image_to_string(img, lang='chi_sim')
-        return text.strip()
+        img = Image.new("RGB", FAKE_SCREEN_SIZE, "white")
+        draw = ImageDraw.Draw(img)
+        draw.text((40, 40), get_foreground_window() or "Desktop", fill="black")
+        for i, title in enumerate(get_running_processes()[:30]):
+            draw.text((40, 100 + i * 20), title, fill="black")
+        img.info["monitors"] = [(0, 0) + FAKE_SCREEN_SIZE]
+        return img
     except Exception as e:
-        print(f"OCR recognition error: {e}")
-        return "OCR recognition failed"
+        print(f"Screenshot failed: {e}")
+        return None
+
+
+def save_screenshot(img):
+    """Save an in-memory screenshot to the screenshot folder (runs on the writer thread)"""
+    try:
+        os.makedirs(SCREENSHOT_FOLDER, exist_ok=True)
+        screenshot_path = os.path.join(SCREENSHOT_FOLDER, f"screenshot_{int(time.time())}.png")
+        img.save(screenshot_path)
+        cleanup_screenshots()
+    except Exception as e:
+        print(f"Saving screenshot failed: {e}")
+
+
+def load_screenshot(screenshot):
+    """Return a PIL image for either an in-memory screenshot or a screenshot path"""
+    if isinstance(screenshot, Image.Image):
+        return screenshot
+    return Image.open(screenshot)
 
 # ---------------------------
-# Get currently open window titles
+# Frame change detection: block hash of the screenshot
+def compute_frame_hash(img):
+    """
+    Compute a cheap block hash of a screenshot: the mean grey level of each
+    block in a FRAME_HASH_SIZE grid.
+    """
+    small = img.convert("L").resize(FRAME_HASH_SIZE, Image.BILINEAR)
+    return bytes(small.getdata())
+
+
+def frame_hash_difference(hash_a, hash_b):
+    """
+    Return the fraction (0-1) of blocks whose grey level differs by more than
+    FRAME_BLOCK_DELTA between two frame hashes.
+    """
+    if hash_a is None or hash_b is None or len(hash_a) != len(hash_b):
+        return 1.0
+    changed = sum(1 for a, b in zip(hash_a, hash_b) if abs(a - b) > FRAME_BLOCK_DELTA)
+    return changed / len(hash_a)
+
+
+def get_frame_change_stats():
+    """Return the frame change counters and the resulting skip rate"""
+    checks = frame_change_stats["checks"]
+    skipped = frame_change_stats["skipped"]
+    return {
+        "checks": checks,
+        "skipped": skipped,
+        "skip_rate": skipped / checks if checks > 0 else 0.0
+    }
+
+
+def get_verdict_cache_stats():
+    """Return the verdict cache hit counters"""
+    return _verdict_cache.get_stats()
+
+
+def get_tile_cache_stats():
+    """Return the tile OCR cache counters and hit rate"""
+    return {
+        "tiles": _tile_cache.stats["tiles"],
+        "ocr_tiles": _tile_cache.stats["ocr_tiles"],
+        "hit_rate": _tile_cache.hit_rate()
+    }
+
+# ---------------------------
+# OCR recognition function (pluggable backend, see ocr_backends.py)
+def get_ocr_backend():
+    """Create the configured OCR backend on first use and keep it warm afterwards"""
+    global _ocr_backend
+    if _ocr_backend is None:
+        _ocr_backend = ocr_backends.create_ocr_backend(OCR_BACKEND)
+        print(f"OCR backend: {_ocr_backend.name}")
+    return _ocr_backend
+
+
+def get_ocr_tile_strategy():
+    """The configured tile strategy, with "auto" resolved for the OCR backend in use"""
+    if OCR_TILE_STRATEGY != "auto":
+        return OCR_TILE_STRATEGY
+    return "none" if get_ocr_backend().name == "pytesseract" else "bands"
+
+
+def get_ocr_workers():
+    """The configured number of OCR worker processes, with None resolved for the OCR backend in use"""
+    if OCR_WORKERS is not None:
+        return OCR_WORKERS
+    if get_ocr_backend().name == "pytesseract":
+        return 1
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+def get_ocr_pool():
+    """Start the OCR worker processes on first use"""
+    global _ocr_pool
+    if _ocr_pool is None:
+        _ocr_pool = ProcessPoolExecutor(max_workers=get_ocr_workers(), initializer=ocr_backends.init_ocr_worker,
+                                        initargs=(OCR_BACKEND,))
+    return _ocr_pool
+
+
+def close_ocr_pool():
+    """Stop the OCR worker processes, so they do not outlive the monitor run"""
+    global _ocr_pool
+    if _ocr_pool is not None:
+        _ocr_pool.shutdown(cancel_futures=True)
+        _ocr_pool = None
+
+
+def ocr_many(images):
+    """
+    Preprocess and OCR a list of images, in parallel across the worker processes
+    when there is more than one (see get_ocr_workers). Images left empty by preprocessing are not OCRed.
+    """
+    images = [ocr_preprocess.preprocess(img, OCR_PREPROCESS_PRESET) for img in images]
+    texts = [""] * len(images)
+    pending = [index for index, img in enumerate(images) if img is not None]
+    if len(pending) > 1 and get_ocr_workers() > 1:
+        results = get_ocr_pool().map(ocr_backends.ocr_worker, [images[index] for index in pending])
+    else:
+        backend = get_ocr_backend()
+        results = [backend.image_to_string(images[index]) for index in pending]
+    for index, text in zip(pending, results):
+        texts[index] = text
+    return texts
+
+
+def ocr_screen_content(screenshot):
+    """
+    OCR text of a screenshot. Errors propagate, so the OCR stage backs off
+    instead of classifying an error message as screen content.
+    """
+    img = load_screenshot(screenshot)
+    tiles = ocr_tiles.split_screen(img, get_ocr_tile_strategy(), OCR_SPLIT_MONITORS)
+    cache = _tile_cache if OCR_TILE_CACHE else None
+    text, ocr_count, tile_count = ocr_tiles.ocr_tiles(tiles, ocr_many, cache,
+                                                      f"{OCR_BACKEND}/{OCR_PREPROCESS_PRESET}")
+    if cache is not None:
+        print(f"OCR ran on {ocr_count}/{tile_count} changed tiles "
+              f"(tile cache hit rate {cache.hit_rate() * 100:.1f}%)")
+    return text
+
+# ---------------------------
+# Get currently open window titles (through a pluggable window source, see window_sources.py)
+def get_window_source():
+    """Create the configured window source on first use"""
+    global _window_source
+    if _window_source is None:
+        _window_source = window_sources.create_window_source(WINDOW_SOURCE)
+        print(f"Window source: {_window_source.name}")
+    return _window_source
+
+
 def get_running_processes():
     """Get the titles of currently running application windows"""
-    apps = []
-    ignored_apps = ['Program Manager', 'Microsoft Text Input Application']
-
-    def get_windows(hwnd, _):
-        title = win32gui.GetWindowText(hwnd)
-        if win32gui.IsWindowVisible(hwnd) and title and title not in ignored_apps:
-            apps.append(title)
+    return get_window_source().list_windows()
 
-    win32gui.EnumWindows(get_windows, None)
-    return apps
+def get_foreground_window():
+    """Get the title of the foreground window"""
+    try:
+        return get_window_source().foreground()
+    except Exception:
+        return ""
 
 # ---------------------------
 # Intervention: pop-up reminder (show reason from JSON output if available)
-def intervene(reason=""):
+def get_intervention_dispatcher(headless=False):
+    """Create the intervention dispatcher on first use with the configured sinks"""
+    global _intervention_dispatcher
+    if _intervention_dispatcher is None:
+        names = INTERVENTION_SINKS or (["websocket", "log"] if headless else ["popup", "log"])
+        sinks = []
+        for name in names:
+            try:
+                sinks.append(interventions.create_sink(name))
+            except Exception as e:
+                print(f"Intervention sink {name} unavailable: {e}")
+        _intervention_dispatcher = interventions.InterventionDispatcher(sinks)
+    return _intervention_dispatcher
+
+
+def close_intervention_dispatcher():
+    global _intervention_dispatcher
+    if _intervention_dispatcher is not None:
+        _intervention_dispatcher.close()
+        _intervention_dispatcher = None
+
+
+def get_intervention_stats():
+    """Counts of received, delivered, coalesced and dropped distraction alerts"""
+    if _intervention_dispatcher is None:
+        return {"received": 0, "delivered": 0, "coalesced": 0, "dropped": 0}
+    return dict(_intervention_dispatcher.stats)
+
+
+def intervene(reason="", timestamp=None):
     """
-    When user is detected as distracted, use tkinter to pop up a reminder window,
-    displaying the distraction reason if provided by the model.
+    When user is detected as distracted, hand a reminder (with the distraction
+    reason if provided by the model) to the intervention dispatcher.
+    Returns immediately; the popup or push happens on the dispatcher's threads.
     """
-    root = tk.Tk()
-    root.withdraw()  # Hide main window
-    message = "Distraction detected"
-    if reason:
-        message += f": {reason}"
-    message += ", please adjust your state to stay focused!"
-    messagebox.showwarning("Intervention Reminder", message)
-    root.destroy()
+    if timestamp is None:
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+    get_intervention_dispatcher().notify(timestamp, reason)
 
 # ---------------------------
 # Get whitelist and blacklist input from user
@@ -117,7 +444,6 @@ def cleanup_screenshots():
     """
     When the number of screenshots exceeds 100, delete the oldest screenshot files.
     """
-    SCREENSHOT_FOLDER = "screenshots"
     MAX_SCREENSHOTS = 100
 
     if not os.path.exists(SCREENSHOT_FOLDER):
@@ -144,89 +470,57 @@ def cleanup_screenshots():
                 print(f"Failed to delete screenshot: {e}")
 
 # ---------------------------
-# Remote large model API call function
-def chat_with_remote_model(messages: List[Dict[str, str]], model: str = "Qwen2.5:7b") -> str:
-    """
-    Call remote API for large language model chat
-    :param messages: List of chat messages
-    :param model: Model name
-    :return: Model response content
-    """
-    endpoint = "http://120.26.224.38:11434/api/chat"
-    payload = {
-        "model": model,
-        "messages": messages,
-        "stream": False,
-        "options": {
-            "temperature": 0.7
-        }
-    }
-    try:
-        response = requests.post(endpoint, json=payload, timeout=30)
-        response.raise_for_status()  # Check HTTP error
+# Rule-based fast path: decide obvious cases without calling the model
+def normalize_for_matching(text):
+    """Case- and locale-insensitive form of a window title, app name or OCR text"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text or "").casefold()).strip()
 
-        result = response.json()
-        return result.get("message", {}).get("content", "")
 
-    except Exception as e:
-        print(f"Remote API call failed: {str(e)}")
-        return f"Error: {str(e)}"
+def match_app_list(text, app_list):
+    """Return the entries of app_list that occur in text (case/locale-insensitive)"""
+    normalized = normalize_for_matching(text)
+    matches = []
+    for app in app_list:
+        app_normalized = normalize_for_matching(app)
+        if app_normalized and app_normalized in normalized:
+            matches.append(app)
+    return matches
 
-# ---------------------------
-# Main program
-def run_monitor(preset_goal=None, preset_white_list=None, preset_black_list=None, headless=False):
-    global WHITE_LIST, BLACK_LIST, stop_monitoring
-    
-    # Reset stop flag
-    stop_monitoring = False
-    
-    # Use preset values or get user input
-    if preset_white_list is not None:
-        WHITE_LIST = preset_white_list
-    if preset_black_list is not None:
-        BLACK_LIST = preset_black_list
-    
-    if preset_goal is None or preset_white_list is None or preset_black_list is None:
-        # Only get user input when no preset values
-        if preset_white_list is None and preset_black_list is None:
-            get_user_input_for_whitelist_and_blacklist()
-        user_goal = preset_goal if preset_goal else input("Enter your current work goal: ")
-    else:
-        user_goal = preset_goal
-    
-    model_name = "Qwen2.5:7b"  # Use model available on remote server
-    
-    if not headless:
-        print("\nFocus monitoring started. The program will check your focus status every 5 minutes...")
-        print("Press Ctrl+C to exit at any time\n")
 
-    try:
-        while not stop_monitoring:
-            # Clean up screenshot files
-            cleanup_screenshots()
-
-            # Screenshot and OCR recognition
-            screenshot_path = capture_screenshot()
-            if not screenshot_path:
-                print("Screenshot failed, retrying in 5 minutes...")
-                time.sleep(300)
-                continue
+def classify_by_rules(foreground_title, screen_content):
+    """
+    Deterministic pre-classifier using the whitelist and blacklist.
+    Returns a verdict dict when the case is obvious, or None when it is
+    ambiguous and the model should decide.
+    """
+    fg_white = match_app_list(foreground_title, WHITE_LIST)
+    fg_black = match_app_list(foreground_title, BLACK_LIST)
+    if fg_black and not fg_white:
+        return {"status": "2. Distracted",
+                "reason": f"Blacklisted application in the foreground: {fg_black[0]}"}
+    if fg_white and not fg_black:
+        # A whitelisted app (e.g. a browser) can still show blacklisted content
+        if match_app_list(screen_content, BLACK_LIST):
+            return None
+        return {"status": "1. Focused"}
+    return None
 
-            screen_content = ocr_screen_content(screenshot_path)
-            running_processes = get_running_processes()
-            running_processes_str = ", ".join(running_processes)
-
-            # Construct model input
-            messages = [
-                {"role": "user", "content": (
-                    f"Work goal: {user_goal}\n"
-                    f"Screen recognized content: {screen_content}\n"
-                    f"Running background processes: {running_processes_str}\n"
-                    f"Whitelist set: {WHITE_LIST}\n"
-                    f"Blacklist set: {BLACK_LIST}\n"
-                )},
-                {"role": "system", "content": (
-                    """You are an intelligent and empathetic focus supervision assistant. Your task is to reasonably analyze the user's work status, and only give reminders when truly necessary. Please judge the user's status according to the following rules:
+def get_local_classifier():
+    """Load the local classifier once; None when it is disabled or has not been trained yet"""
+    global _local_classifier, _local_classifier_loaded
+    if LOCAL_CLASSIFIER and not _local_classifier_loaded:
+        _local_classifier_loaded = True
+        if os.path.exists(local_classifier.MODEL_FILE):
+            try:
+                _local_classifier = local_classifier.LocalClassifier.load(local_classifier.MODEL_FILE)
+                print(f"Local classifier loaded: {local_classifier.MODEL_FILE}")
+            except Exception as e:
+                print(f"Failed to load local classifier: {e}")
+    return _local_classifier if LOCAL_CLASSIFIER else None
+
+# ---------------------------
+# Model classification
+FOCUS_SYSTEM_PROMPT = """You are an intelligent and empathetic focus supervision assistant. Your task is to reasonably analyze the user's work status, and only give reminders when truly necessary. Please judge the user's status according to the following rules:
 1. Focused: Meets the following condition:
    - Screen content is basically related to the work goal
 
@@ -252,54 +546,700 @@ Output format (output ONLY one of the following JSON formats):
 - Clear distracted state:
   {"status": "2. Distracted", "reason": "<specific and friendly description of distraction reason>"}
 Ensure your output only contains the JSON above, do not add any other content."""
-                )}
-            ]
 
-            try:
-                print("Analyzing your focus status...")
-                # Call remote API model
-                output = chat_with_remote_model(messages, model_name)
-
-                # Extract reasoning and final output
-                reasoning_pattern = r"<think>(.*?)</think>"
-                final_output_pattern = r"</think>\s*(.+)"
-                reasoning_match = re.search(reasoning_pattern, output, re.DOTALL)
-                if reasoning_match:
-                    reasoning_text = reasoning_match.group(1).strip()
-                else:
-                    reasoning_text = ""
-                final_output_match = re.search(final_output_pattern, output, re.DOTALL)
-                if final_output_match:
-                    final_output_text = final_output_match.group(1).strip()
-                else:
-                    final_output_text = output.strip()
-                # Try to parse final output as JSON
+
+def compact_snapshot_text(user_goal, screen_content, running_processes, builder=None):
+    """Screen text lines and window titles as they go into the prompt"""
+    if not COMPACT_PROMPT:
+        return [line for line in screen_content.splitlines() if line.strip()], list(running_processes)
+    builder = builder or _prompt_builder
+    app_list = WHITE_LIST + BLACK_LIST
+    screen_lines = builder.compact_screen_text(user_goal, screen_content, app_list, PROMPT_TOKEN_BUDGET)
+    windows = builder.compact_windows(user_goal, running_processes, app_list)
+    stats = builder.last_stats
+    print(f"Prompt screen text: {stats['lines_in']} -> {stats['lines_out']} lines, "
+          f"~{stats['tokens_in']} -> ~{stats['tokens_out']} tokens")
+    return screen_lines, windows
+
+
+def screen_delta(baseline, screen_lines):
+    """
+    Compare the screen lines with the last snapshot the model judged.
+    Returns (previous verdict, added lines, removed lines), or None when a full
+    snapshot should be sent instead.
+    """
+    if baseline is None or baseline["deltas"] >= DELTA_FULL_EVERY:
+        return None
+    previous_keys = {prompt_builder.line_key(line) for line in baseline["lines"]}
+    current_keys = {prompt_builder.line_key(line) for line in screen_lines}
+    added = [line for line in screen_lines if prompt_builder.line_key(line) not in previous_keys]
+    removed = [line for line in baseline["lines"] if prompt_builder.line_key(line) not in current_keys]
+    if len(added) + len(removed) > DELTA_MAX_RATIO * max(len(baseline["lines"]), 1):
+        return None
+    return baseline["verdict"], added, removed
+
+
+def build_focus_messages(user_goal, screen_lines, running_processes, delta=None):
+    """
+    Construct the model input for one snapshot. The static system prompt comes
+    first and the per-session settings before the per-snapshot text, so the
+    server can reuse its prompt prefix cache across calls.
+    With a delta (previous verdict, added lines, removed lines) only the screen
+    changes since the previous check are sent.
+    """
+    running_processes_str = ", ".join(running_processes)
+    content = (
+        f"Work goal: {user_goal}\n"
+        f"Whitelist set: {WHITE_LIST}\n"
+        f"Blacklist set: {BLACK_LIST}\n"
+        f"Running background processes: {running_processes_str}\n"
+    )
+    if delta is None:
+        screen_content = "\n".join(screen_lines)
+        content += f"Screen recognized content: {screen_content}\n"
+    else:
+        previous_verdict, added, removed = delta
+        added_str = "\n".join(added) or "(none)"
+        removed_str = "\n".join(removed) or "(none)"
+        content += (
+            f"Verdict at the previous check: {json.dumps(previous_verdict, ensure_ascii=False)}\n"
+            f"Only the screen content that changed since the previous check is shown; "
+            f"judge the current state.\n"
+            f"Screen content added: {added_str}\n"
+            f"Screen content removed: {removed_str}\n"
+        )
+    return [
+        {"role": "system", "content": FOCUS_SYSTEM_PROMPT},
+        {"role": "user", "content": content}
+    ]
+
+
+def classify_with_remote_model(messages, model=None):
+    """
+    Stream a JSON-constrained verdict from the remote model and stop reading
+    as soon as the JSON object is complete.
+    Raises ValueError when the output is not a usable verdict and
+    requests.exceptions.RequestException when the call itself fails.
+    """
+    chunks = llm_client.stream_chat(messages, model, format="json", timeout=30,
+                                    options={"temperature": 0.7, "num_predict": CLASSIFY_NUM_PREDICT})
+    verdict, raw_output = llm_client.read_first_json(chunks)
+    if not isinstance(verdict, dict) or not str(verdict.get("status", "")).startswith(("1", "2")):
+        raise ValueError(f"Not a focus verdict (raw output: {raw_output.strip()})")
+    return verdict
+
+# ---------------------------
+# Batch classification: several snapshots per model request
+BATCH_SYSTEM_PROMPT = FOCUS_SYSTEM_PROMPT.split("Output format")[0] + """Several numbered snapshots follow. Judge each one on its own.
+
+Output format (output ONLY this JSON object, with exactly one item per snapshot, in snapshot order):
+  {"verdicts": [{"index": <snapshot number>, "captured": "<capture time of the snapshot>", "status": "1. Focused"},
+                {"index": <snapshot number>, "captured": "<capture time of the snapshot>", "status": "2. Distracted", "reason": "<specific and friendly description of distraction reason>"}]}
+Ensure your output only contains the JSON above, do not add any other content."""
+
+
+def build_batch_messages(records):
+    """
+    Construct one model input for several snapshots (dicts with timestamp, goal,
+    screen, windows, as stored by the offline spool)
+    """
+    builder = prompt_builder.PromptBuilder()
+    budget = max(PROMPT_TOKEN_BUDGET // len(records), 100)
+    parts = [f"Whitelist set: {WHITE_LIST}\nBlacklist set: {BLACK_LIST}\n"]
+    for index, record in enumerate(records):
+        if COMPACT_PROMPT:
+            app_list = WHITE_LIST + BLACK_LIST
+            screen_lines = builder.compact_screen_text(record["goal"], record["screen"], app_list, budget)
+            windows = builder.compact_windows(record["goal"], record["windows"], app_list)
+        else:
+            screen_lines, windows = record["screen"].splitlines(), record["windows"]
+        screen_content = "\n".join(screen_lines)
+        parts.append(
+            f"Snapshot {index} (captured {record['timestamp']}):\n"
+            f"Work goal: {record['goal']}\n"
+            f"Running background processes: {', '.join(windows)}\n"
+            f"Screen recognized content: {screen_content}\n"
+        )
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": "\n".join(parts)}
+    ]
+
+
+def classify_batch_with_remote_model(records, model=None):
+    """
+    Classify several snapshots in one streamed request.
+    Returns {snapshot index: verdict} for the items that validated: the index is in
+    range and unique, the echoed capture time matches and the status is usable.
+    Raises ValueError when the output is not a verdict list at all and
+    requests.exceptions.RequestException when the call itself fails.
+    """
+    chunks = llm_client.stream_chat(build_batch_messages(records), model, format="json", timeout=60,
+                                    options={"temperature": 0.7,
+                                             "num_predict": CLASSIFY_NUM_PREDICT * len(records)})
+    output, raw_output = llm_client.read_first_json(chunks)
+    items = output.get("verdicts") if isinstance(output, dict) else output
+    if not isinstance(items, list):
+        raise ValueError(f"Not a verdict list (raw output: {raw_output.strip()})")
+    verdicts = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index")
+        if not isinstance(index, int) or not 0 <= index < len(records) or index in verdicts:
+            continue
+        if str(item.get("captured", "")).strip() != records[index]["timestamp"]:
+            continue
+        if not str(item.get("status", "")).startswith(("1", "2")):
+            continue
+        verdicts[index] = {key: value for key, value in item.items() if key in ("status", "reason")}
+    return verdicts
+
+
+def classify_batch(records, model_name=None, check_scheduler=None):
+    """
+    Classify snapshots BATCH_SIZE at a time. Items of a batch that fail validation
+    are retried as a smaller batch; a batch that fails entirely is split in half,
+    down to single-snapshot calls.
+    Returns one (verdict, source) per record, see call_model_with_retries.
+    """
+    results = []
+    for start in range(0, len(records), BATCH_SIZE):
+        results.extend(_classify_batch(records[start:start + BATCH_SIZE], model_name, check_scheduler))
+    return results
+
+
+def _classify_batch(records, model_name, check_scheduler):
+    if len(records) == 1:
+        record = records[0]
+        screen_lines, windows = compact_snapshot_text(record["goal"], record["screen"], record["windows"],
+                                                      prompt_builder.PromptBuilder())
+        messages = build_focus_messages(record["goal"], screen_lines, windows)
+        return [call_model_with_retries(messages, model_name, check_scheduler)]
+    if check_scheduler is not None and check_scheduler.budget_wait() > 0:
+        print("Hourly model call budget used up, postponing the batch")
+        return [(None, "budget")] * len(records)
+    try:
+        verdicts = classify_batch_with_remote_model(records, model_name)
+    except ValueError as e:
+        print(f"Failed to parse batch output: {e}")
+        verdicts = {}
+    except Exception as e:
+        print(f"Remote API call failed: {str(e)}")
+        return [(None, "offline")] * len(records)
+    # Only calls the endpoint answered count against the budget
+    if check_scheduler is not None:
+        check_scheduler.record_model_call()
+    results = [(verdicts[i], "model") if i in verdicts else None for i in range(len(records))]
+    missing = [i for i in range(len(records)) if i not in verdicts]
+    if not missing:
+        return results
+    print(f"{len(missing)} of {len(records)} batch verdicts missing or invalid, retrying them")
+    if len(missing) == len(records):
+        middle = len(records) // 2
+        return (_classify_batch(records[:middle], model_name, check_scheduler)
+                + _classify_batch(records[middle:], model_name, check_scheduler))
+    for i, result in zip(missing, _classify_batch([records[i] for i in missing], model_name, check_scheduler)):
+        results[i] = result
+    return results
+
+# ---------------------------
+# Record and report a verdict
+def record_verdict(json_output, source, features=None, timestamp=None, report=True):
+    """
+    Log a verdict tagged with the path that produced it ("model", "rules",
+    "verdict_cache", "local_model" or "frame_unchanged"), then report it to the user.
+    features: optional (goal, screen_content, windows, foreground) of the snapshot,
+    recorded for training the local classifier.
+    timestamp: when the snapshot was captured (defaults to now).
+    report: False for replayed snapshots, which are logged without intervening.
+    """
+    if timestamp is None:
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+    verdict = {key: value for key, value in json_output.items() if key != "source"}
+    verdict["source"] = source
+    log_json_output(timestamp, verdict)
+    if RECORD_FEATURES and features is not None:
+        try:
+            local_classifier.record_features(timestamp, *features)
+        except Exception as e:
+            print(f"Failed to record snapshot features: {e}")
+    if report:
+        report_focus_status(timestamp, json_output)
+
+
+def report_focus_status(timestamp, json_output):
+    """
+    Print the focus status and intervene when the verdict is distracted
+    """
+    status = json_output.get("status", "")
+    if status == "1. Focused":
+        # No intervention if focused
+        print(f"[{timestamp}] Result: You are currently focused!")
+        if _intervention_dispatcher is not None:
+            _intervention_dispatcher.clear()
+    elif status == "2. Distracted":
+        reason = json_output.get("reason", "")
+        print(f"[{timestamp}] Result: Distracted - {reason}")
+        intervene(reason, timestamp)
+    else:
+        print(f"[{timestamp}] Unable to determine status, please check model output.")
+
+# ---------------------------
+# Monitor pipeline stages
+def prepare_snapshot(screenshot, captured_at, state):
+    """
+    Frame change detection, OCR and window enumeration for one screenshot.
+    When the frame is essentially unchanged, the previous OCR text and windows
+    are reused and the snapshot is marked "unchanged". OCR errors are raised
+    to the OCR stage, which schedules a retry.
+    """
+    frame_change_stats["checks"] += 1
+    try:
+        frame_hash = compute_frame_hash(load_screenshot(screenshot))
+    except Exception as e:
+        print(f"Frame hash failed: {e}")
+        frame_hash = None
+    difference = frame_hash_difference(frame_hash, state.get("last_frame_hash"))
+    if (state.get("last_snapshot") is not None and difference < FRAME_CHANGE_THRESHOLD
+            and state["consecutive_skips"] < MAX_CONSECUTIVE_SKIPS):
+        state["consecutive_skips"] += 1
+        frame_change_stats["skipped"] += 1
+        stats = get_frame_change_stats()
+        print(f"Screen unchanged ({difference * 100:.1f}% of blocks changed), skipping OCR "
+              f"(skipped {stats['skipped']}/{stats['checks']} checks, {stats['skip_rate'] * 100:.1f}%)")
+        return dict(state["last_snapshot"], timestamp=captured_at, unchanged=True, frame_hash=frame_hash)
+
+    state["consecutive_skips"] = 0
+    snapshot = {
+        "timestamp": captured_at,
+        "screen_content": ocr_screen_content(screenshot),
+        "windows": get_running_processes(),
+        "foreground": get_foreground_window(),
+        "unchanged": False,
+        "frame_hash": frame_hash,
+    }
+    state["last_frame_hash"] = frame_hash
+    state["last_snapshot"] = snapshot
+    return snapshot
+
+
+def call_model_with_retries(messages, model_name, check_scheduler=None):
+    """
+    Classify with the remote model, retrying unusable output right away.
+    Returns (verdict, "model"), (None, None) when the output could not be used,
+    (None, "offline") when the endpoint could not be reached, or (None, "budget")
+    when the hourly model call budget is used up. Only calls the endpoint
+    answered count against the budget.
+    """
+    for attempt in range(CLASSIFY_RETRIES + 1):
+        if check_scheduler is not None and check_scheduler.budget_wait() > 0:
+            print("Hourly model call budget used up, skipping this snapshot")
+            return None, "budget"
+        started = time.monotonic()
+        try:
+            # Call remote API model
+            json_output = classify_with_remote_model(messages, model_name)
+            print(f"Model verdict received in {time.monotonic() - started:.1f} seconds")
+            if check_scheduler is not None:
+                check_scheduler.record_model_call()
+            return json_output, "model"
+        except ValueError as e:
+            if check_scheduler is not None:
+                check_scheduler.record_model_call()
+            retrying = ", retrying" if attempt < CLASSIFY_RETRIES else ""
+            print(f"Failed to parse JSON output{retrying}: {e}")
+        except Exception as e:
+            print(f"Remote API call failed: {str(e)}")
+            return None, "offline"
+    return None, None
+
+
+def remember_verdict(state, snapshot, json_output):
+    """Keep a successful verdict together with the frame hash it was given for"""
+    state["last_result"] = json_output
+    state["last_result_hash"] = snapshot.get("frame_hash")
+
+
+def classify_snapshot(snapshot, user_goal, model_name, state, check_scheduler=None):
+    """
+    Decide the focus status of one snapshot, trying the cheap paths first:
+    unchanged frame, whitelist/blacklist rules, verdict cache, local classifier,
+    and finally the remote model.
+    Returns (verdict, source), (None, None) when the model output could not be used,
+    (None, "offline") when the model endpoint could not be reached,
+    or (None, "budget") when the hourly model call budget is used up.
+    """
+    # Reuse the previous verdict only if it was given for this same frame: a snapshot that
+    # failed to classify (offline, over budget, unusable output) leaves the verdict untouched
+    if (snapshot["unchanged"] and state.get("last_result") is not None
+            and frame_hash_difference(snapshot.get("frame_hash"), state.get("last_result_hash"))
+            < FRAME_CHANGE_THRESHOLD):
+        return state["last_result"], "frame_unchanged"
+
+    screen_content = snapshot["screen_content"]
+    running_processes = snapshot["windows"]
+    foreground_title = snapshot["foreground"]
+
+    # Rule-based fast path for obvious whitelist/blacklist cases
+    json_output = classify_by_rules(foreground_title, screen_content)
+    if json_output is not None:
+        print(f"Decided by whitelist/blacklist rules (foreground: {foreground_title})")
+        remember_verdict(state, snapshot, json_output)
+        return json_output, "rules"
+
+    # Verdict cache: reuse a recent verdict for an equivalent snapshot
+    fingerprint = None
+    if VERDICT_CACHE:
+        goal_key = verdict_cache.normalize_goal(user_goal, WHITE_LIST, BLACK_LIST)
+        fingerprint = _verdict_cache.fingerprint(goal_key, screen_content, running_processes)
+        cached, similarity = _verdict_cache.lookup(fingerprint)
+        if cached is not None:
+            stats = _verdict_cache.get_stats()
+            print(f"Verdict cache hit (similarity {similarity * 100:.0f}%), model call avoided "
+                  f"({stats['hits']}/{stats['hits'] + stats['misses']} checks, {stats['hit_rate'] * 100:.1f}%)")
+            remember_verdict(state, snapshot, cached)
+            return cached, "verdict_cache"
+
+    # Local classifier: call the remote model only when it is not confident
+    classifier = get_local_classifier()
+    if classifier is not None:
+        json_output, confidence = classifier.predict(user_goal, screen_content, running_processes,
+                                                     foreground_title)
+        if confidence >= LOCAL_CLASSIFIER_THRESHOLD:
+            print(f"Decided by local classifier (confidence {confidence * 100:.0f}%)")
+            remember_verdict(state, snapshot, json_output)
+            return json_output, "local_model"
+
+    screen_lines, windows = compact_snapshot_text(user_goal, screen_content, running_processes)
+    delta = screen_delta(state.get("prompt_baseline"), screen_lines) if DELTA_PROMPT else None
+    if delta is not None:
+        print(f"Sending screen changes since the previous check (+{len(delta[1])}/-{len(delta[2])} lines)")
+    messages = build_focus_messages(user_goal, screen_lines, windows, delta)
+    print("Analyzing your focus status...")
+    json_output, source = call_model_with_retries(messages, model_name, check_scheduler)
+    if json_output is None:
+        return None, source
+    if fingerprint is not None:
+        _verdict_cache.store(fingerprint, json_output)
+    if DELTA_PROMPT:
+        deltas = 0 if delta is None else state["prompt_baseline"]["deltas"] + 1
+        state["prompt_baseline"] = {"lines": screen_lines, "verdict": json_output, "deltas": deltas}
+    remember_verdict(state, snapshot, json_output)
+    return json_output, "model"
+
+
+async def window_sampling_stage(sampler, check_scheduler):
+    """Cheap high-frequency tier: sample windows and request a check when the window mix changes"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            windows, foreground = await loop.run_in_executor(
+                None, lambda: (get_running_processes(), get_foreground_window()))
+            sampler.add_sample(foreground, windows)
+            if sampler.significant_change():
+                print(f"Window change detected (foreground: {window_sampler.app_name(foreground)}), checking now")
+                sampler.trigger()
+                check_scheduler.request_check()
+        except Exception as e:
+            print(f"Window sampling error: {e}")
+        await asyncio.sleep(window_sampler.WINDOW_SAMPLE_INTERVAL)
+
+
+async def foreground_event_stage(source, check_scheduler, sampler=None):
+    """
+    Event-driven tier: request a check when the foreground app changes.
+    Bursts of events (e.g. alt-tabbing through windows) are debounced until the
+    foreground has been stable for FOREGROUND_DEBOUNCE seconds.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    source.watch_foreground(lambda title: loop.call_soon_threadsafe(events.put_nowait, title))
+    last_app = window_sampler.app_name(get_foreground_window())
+    last_trigger = 0.0
+    try:
+        while True:
+            title = await events.get()
+            while True:
                 try:
-                    json_output = json.loads(final_output_text)
+                    title = await asyncio.wait_for(events.get(), timeout=FOREGROUND_DEBOUNCE)
+                except asyncio.TimeoutError:
+                    break
+            app = window_sampler.app_name(title)
+            if app == last_app:
+                continue
+            last_app = app
+            previous_trigger = sampler.last_trigger if sampler is not None else last_trigger
+            if time.time() - previous_trigger < window_sampler.MIN_TRIGGER_GAP:
+                continue
+            last_trigger = time.time()
+            print(f"Foreground changed to {app}, checking now")
+            if sampler is not None:
+                sampler.add_sample(title, await loop.run_in_executor(None, get_running_processes))
+                sampler.trigger()
+            check_scheduler.request_check()
+    finally:
+        source.stop_watching()
+
+
+async def capture_stage(screenshots, check_scheduler, sampler=None):
+    """Take screenshots when the scheduler says so; waits when the OCR stage is behind"""
+    loop = asyncio.get_running_loop()
+    while True:
+        if sampler is not None:
+            sampler.mark_checked()
+        # Clean up screenshot files (memory mode cleans up on the writer thread, fake mode saves none)
+        if CAPTURE_MODE == "file":
+            await loop.run_in_executor(None, cleanup_screenshots)
+        captured_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+        screenshot = await loop.run_in_executor(None, capture_screenshot)
+        if screenshot is None:
+            check_scheduler.on_failure()
+            print(f"Screenshot failed, retrying in about {check_scheduler.next_delay():.0f} seconds...")
+        else:
+            await screenshots.put((screenshot, captured_at))
+        await check_scheduler.sleep()
+
+
+async def ocr_stage(screenshots, snapshots, check_scheduler):
+    """Run frame change detection, OCR and window enumeration in a worker thread"""
+    loop = asyncio.get_running_loop()
+    state = {"last_frame_hash": None, "last_snapshot": None, "consecutive_skips": 0}
+    while True:
+        screenshot, captured_at = await screenshots.get()
+        try:
+            snapshot = await loop.run_in_executor(None, prepare_snapshot, screenshot, captured_at, state)
+            await snapshots.put(snapshot)
+        except Exception as e:
+            print(f"OCR stage error: {e}")
+            check_scheduler.on_failure()
+
+
+async def classify_stage(snapshots, verdicts, user_goal, model_name, check_scheduler, spool=None, spool_ready=None):
+    """
+    Classify snapshots in a worker thread, so the next capture and OCR can overlap the model call.
+    Snapshots that fail because the endpoint is unreachable or the hourly budget is used
+    up go to the spool; the next successful model call wakes the replayer.
+    """
+    loop = asyncio.get_running_loop()
+    state = {"last_result": None, "last_result_hash": None}
+    while True:
+        snapshot = await snapshots.get()
+        try:
+            json_output, source = await loop.run_in_executor(
+                None, classify_snapshot, snapshot, user_goal, model_name, state, check_scheduler)
+        except Exception as e:
+            print(f"Model call error: {e}")
+            check_scheduler.on_failure()
+            continue
+        if json_output is None:
+            if source in ("offline", "budget") and spool is not None:
+                try:
+                    await loop.run_in_executor(None, spool.append, snapshot["timestamp"], user_goal,
+                                               snapshot["screen_content"], snapshot["windows"], snapshot["foreground"])
+                    print(f"Snapshot spooled ({len(spool)} waiting for replay)")
                 except Exception as e:
-                    print(f"Failed to parse JSON output: {e}")
-                    print("Raw output:", final_output_text)
-                    print("Will retry in 5 minutes...")
-                    time.sleep(300)
-                    continue
-                timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-                log_json_output(timestamp, final_output_text)
-                status = json_output.get("status", "")
-                if status == "1. Focused":
-                    # No intervention if focused
-                    print(f"[{timestamp}] Result: You are currently focused!")
-                elif status == "2. Distracted":
-                    reason = json_output.get("reason", "")
-                    print(f"[{timestamp}] Result: Distracted - {reason}")
-                    intervene(reason)
-                else:
-                    print(f"[{timestamp}] Unable to determine status, please check model output.")
+                    print(f"Failed to spool snapshot: {e}")
+            if source != "budget":
+                check_scheduler.on_failure()
+            continue
+        if source == "model" and spool_ready is not None:
+            spool_ready.set()
+        check_scheduler.on_verdict(json_output.get("status", ""))
+        delay = check_scheduler.next_delay()
+        print(f"Next check in about {delay:.0f} seconds "
+              f"({check_scheduler.model_calls_last_hour()} model calls in the last hour)")
+        # Log the time this verdict covers, so ratios are not skewed by the faster checks after a distraction
+        await verdicts.put((snapshot, dict(json_output, interval=round(delay)), source))
+
+
+def replay_spooled_snapshots(records, model_name, check_scheduler=None):
+    """
+    Classify spooled snapshots in batches and log each verdict under its original
+    timestamp. Returns one classification source per record, see call_model_with_retries.
+    """
+    sources = []
+    for record, (json_output, source) in zip(records, classify_batch(records, model_name, check_scheduler)):
+        if json_output is not None:
+            features = (record["goal"], record["screen"], record["windows"], record["foreground"])
+            record_verdict(dict(json_output, replayed=True), source, features, record["timestamp"], report=False)
+        sources.append(source)
+    return sources
+
+
+async def replay_stage(spool, model_name, check_scheduler, spool_ready):
+    """
+    Drain the offline spool in batches, with bounded concurrency, once the endpoint answers again:
+    every SPOOL_REPLAY_INTERVAL seconds, or right after a live model call succeeded.
+    Rounds wait while the hourly budget is used up; the single-snapshot probe that
+    opens a round does not count against it.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(offline_spool.SPOOL_REPLAY_CONCURRENCY)
+
+    async def replay(batch, batch_scheduler):
+        async with semaphore:
+            try:
+                sources = await loop.run_in_executor(
+                    None, replay_spooled_snapshots, batch, model_name, batch_scheduler)
             except Exception as e:
-                print(f"Model call error: {e}")
+                print(f"Replay of {len(batch)} spooled snapshots failed: {e}")
+                sources = ["offline"] * len(batch)
+            return list(zip(batch, sources))
+
+    while True:
+        try:
+            await asyncio.wait_for(spool_ready.wait(), timeout=offline_spool.SPOOL_REPLAY_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        spool_ready.clear()
+        if check_scheduler.budget_wait() > 0:
+            continue
+        # Probe with a single snapshot first, so an endpoint that is still down costs one timeout
+        limit, batch_scheduler = 1, None
+        while True:
+            records = await loop.run_in_executor(None, spool.peek, limit)
+            if not records:
+                break
+            print(f"Replaying {len(records)} of {len(spool)} spooled snapshots...")
+            batches = [records[i:i + BATCH_SIZE] for i in range(0, len(records), BATCH_SIZE)]
+            results = [result for batch_results in await asyncio.gather(
+                           *(replay(batch, batch_scheduler) for batch in batches))
+                       for result in batch_results]
+            limit, batch_scheduler = offline_spool.SPOOL_REPLAY_CONCURRENCY * BATCH_SIZE, check_scheduler
+            # Snapshots the model answered (or could not answer usefully) leave the spool;
+            # unreachable endpoint or exhausted budget keeps them for the next round
+            done = [record["timestamp"] for record, source in results if source not in ("offline", "budget")]
+            await loop.run_in_executor(None, spool.remove, done)
+            if len(done) < len(records):
+                break
+
+
+async def record_stage(verdicts, user_goal, sampler=None):
+    """Log verdicts (with per-app foreground durations since the last one) and intervene when distracted"""
+    loop = asyncio.get_running_loop()
+    while True:
+        snapshot, json_output, source = await verdicts.get()
+        if sampler is not None:
+            durations = sampler.pop_durations()
+            if durations:
+                json_output = dict(json_output, app_durations=durations)
+        features = None
+        if not snapshot["unchanged"]:
+            features = (user_goal, snapshot["screen_content"], snapshot["windows"],
+                        snapshot["foreground"])
+        try:
+            await loop.run_in_executor(None, record_verdict, json_output, source, features, snapshot["timestamp"])
+        except Exception as e:
+            print(f"Failed to record verdict: {e}")
+
+
+async def monitor_pipeline(user_goal, model_name, interval=None):
+    """
+    Run capture -> OCR -> classification -> logging as concurrent stages
+    connected by bounded queues. Cancel the task running this coroutine to stop.
+    """
+    if interval is None:
+        interval = CHECK_INTERVAL
+    check_scheduler = scheduler.AdaptiveScheduler(interval)
+    screenshots = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    snapshots = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    verdicts = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    sampler = window_sampler.WindowSampler() if WINDOW_SAMPLING else None
+    spool = offline_spool.OfflineSpool() if OFFLINE_SPOOL else None
+    spool_ready = asyncio.Event()
+    tasks = [
+        asyncio.create_task(capture_stage(screenshots, check_scheduler, sampler)),
+        asyncio.create_task(ocr_stage(screenshots, snapshots, check_scheduler)),
+        asyncio.create_task(classify_stage(snapshots, verdicts, user_goal, model_name, check_scheduler,
+                                           spool, spool_ready)),
+        asyncio.create_task(record_stage(verdicts, user_goal, sampler)),
+    ]
+    if spool is not None:
+        tasks.append(asyncio.create_task(replay_stage(spool, model_name, check_scheduler, spool_ready)))
+    if sampler is not None:
+        tasks.append(asyncio.create_task(window_sampling_stage(sampler, check_scheduler)))
+    if FOREGROUND_EVENTS:
+        tasks.append(asyncio.create_task(foreground_event_stage(get_window_source(), check_scheduler, sampler)))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def stop_monitor():
+    """
+    Stop a running monitor from any thread (e.g. the web backend).
+    Returns False when no monitor is running.
+    """
+    if _monitor_loop is None or _monitor_task is None:
+        return False
+    _monitor_loop.call_soon_threadsafe(_monitor_task.cancel)
+    return True
+
+
+def wait_for_stop(timeout=None):
+    """
+    Wait until no monitor run is active (including its cleanup).
+    Returns False if one is still running after timeout seconds.
+    """
+    if not _run_lock.acquire(timeout=-1 if timeout is None else timeout):
+        return False
+    _run_lock.release()
+    return True
+
+# ---------------------------
+# Main program
+def run_monitor(preset_goal=None, preset_white_list=None, preset_black_list=None, headless=False):
+    global WHITE_LIST, BLACK_LIST
+    
+    # Use preset values or get user input
+    if preset_white_list is not None:
+        WHITE_LIST = preset_white_list
+    if preset_black_list is not None:
+        BLACK_LIST = preset_black_list
+    
+    if preset_goal is None or preset_white_list is None or preset_black_list is None:
+        # Only get user input when no preset values
+        if preset_white_list is None and preset_black_list is None:
+            get_user_input_for_whitelist_and_blacklist()
+        user_goal = preset_goal if preset_goal else input("Enter your current work goal: ")
+    else:
+        user_goal = preset_goal
+    
+    model_name = llm_client.LLM_MODEL  # Use model available on remote server
+    
+    if not headless:
+        print("\nFocus monitoring started. The program will check your focus status every few minutes, "
+              "more often right after a distraction...")
+        print("Press Ctrl+C to exit at any time\n")
+
+    # A previous run that is still shutting down finishes its cleanup first
+    _run_lock.acquire()
+    frame_change_stats["checks"] = 0
+    frame_change_stats["skipped"] = 0
 
-            # Wait 5 minutes
-            print("\nNext check will be in 5 minutes...\n")
-            time.sleep(300)
+    async def main():
+        global _monitor_loop, _monitor_task
+        _monitor_loop = asyncio.get_running_loop()
+        _monitor_task = asyncio.current_task()
+        try:
+            await monitor_pipeline(user_goal, model_name)
+        finally:
+            _monitor_loop = None
+            _monitor_task = None
 
-    except KeyboardInterrupt:
+    try:
+        get_intervention_dispatcher(headless)
+        asyncio.run(main())
+    except (KeyboardInterrupt, asyncio.CancelledError):
         print("\nProgram stopped. Thank you for using DuKe:the Focus Monitoring Tool!")
+    finally:
+        try:
+            close_intervention_dispatcher()
+            close_ocr_pool()
+            close_log_writer()
+        finally:
+            _run_lock.release()
@@ -0,0 +1,201 @@
+import time
+import queue
+import asyncio
+import threading
+
+try:
+    import tkinter as tk
+    from tkinter import messagebox
+except ImportError:
+    tk = None
+
+# Minimum seconds between two delivered distraction alerts; alerts in between are coalesced
+ALERT_MIN_INTERVAL = 120
+# Distinct reasons kept in a coalesced alert
+MAX_COALESCED_REASONS = 3
+
+
+def format_alert_message(alert):
+    """Human-readable text for a (possibly coalesced) distraction alert"""
+    message = "Distraction detected"
+    if alert["reasons"]:
+        message += ": " + "; ".join(alert["reasons"])
+    if alert["count"] > 1:
+        message += f" ({alert['count']} times since {alert['first_timestamp']})"
+    return message + ", please adjust your state to stay focused!"
+
+
+# ---------------------------
+# Sinks
+class InterventionSink:
+    """Where alerts are delivered. send() runs on the sink's own worker thread and may block."""
+    name = "base"
+
+    def send(self, alert):
+        raise NotImplementedError
+
+
+class LogSink(InterventionSink):
+    name = "log"
+
+    def send(self, alert):
+        print(f"[{alert['timestamp']}] Intervention: {format_alert_message(alert)}")
+
+
+class TkPopupSink(InterventionSink):
+    """Desktop warning popup; blocks only its own worker thread until dismissed"""
+    name = "popup"
+
+    def __init__(self):
+        if tk is None:
+            raise RuntimeError("tkinter is not available")
+
+    def send(self, alert):
+        root = tk.Tk()
+        root.withdraw()  # Hide main window
+        try:
+            messagebox.showwarning("Intervention Reminder", format_alert_message(alert))
+        finally:
+            root.destroy()
+
+
+class BroadcastSink(InterventionSink):
+    """
+    Push alerts to subscribers on other event loops, e.g. the web backend's
+    WebSocket connections. Each subscriber gets its own asyncio queue.
+    """
+    name = "websocket"
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, maxsize=100):
+        """Register a queue on the calling event loop; call from a coroutine"""
+        subscriber = asyncio.Queue(maxsize=maxsize)
+        with self._lock:
+            self._subscribers[subscriber] = asyncio.get_running_loop()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.pop(subscriber, None)
+
+    def send(self, alert):
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for subscriber, loop in subscribers:
+            loop.call_soon_threadsafe(self._put, subscriber, alert)
+
+    @staticmethod
+    def _put(subscriber, alert):
+        # A client that stopped reading loses its oldest alert rather than blocking the others
+        if subscriber.full():
+            subscriber.get_nowait()
+        subscriber.put_nowait(alert)
+
+
+# Shared with the web backend, which subscribes its WebSocket connections to it
+BROADCAST_SINK = BroadcastSink()
+
+
+def create_sink(name):
+    """Create a sink by name: "popup", "websocket" or "log" """
+    if name == "popup":
+        return TkPopupSink()
+    if name == "websocket":
+        return BROADCAST_SINK
+    if name == "log":
+        return LogSink()
+    raise ValueError(f"Unknown intervention sink: {name}")
+
+
+# ---------------------------
+# Dispatcher
+class InterventionDispatcher:
+    """
+    Deliver distraction alerts without blocking the monitor. Alerts arriving
+    less than ALERT_MIN_INTERVAL after the last delivered one are coalesced into
+    a single pending alert, which is dropped if the user refocuses first.
+    Each sink has its own worker thread, so a popup waiting for a click does
+    not hold back the WebSocket push.
+    """
+
+    def __init__(self, sinks):
+        self.min_interval = ALERT_MIN_INTERVAL
+        self.stats = {"received": 0, "delivered": 0, "coalesced": 0, "dropped": 0}
+        self._pending = None
+        self._last_delivery = float("-inf")
+        self._closed = False
+        self._condition = threading.Condition()
+        self._sink_queues = []
+        self._threads = []
+        for sink in sinks:
+            sink_queue = queue.Queue()
+            self._sink_queues.append(sink_queue)
+            self._start_thread(self._sink_loop, sink, sink_queue, name=f"intervention-{sink.name}")
+        self._start_thread(self._dispatch_loop, name="intervention-dispatcher")
+
+    def _start_thread(self, target, *args, name):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def notify(self, timestamp, reason=""):
+        """Queue a distraction alert; returns immediately"""
+        with self._condition:
+            self.stats["received"] += 1
+            if self._pending is None:
+                self._pending = {"type": "distraction", "timestamp": timestamp, "first_timestamp": timestamp,
+                                 "reasons": [], "count": 0}
+            else:
+                self.stats["coalesced"] += 1
+            self._pending["timestamp"] = timestamp
+            self._pending["count"] += 1
+            if reason and reason not in self._pending["reasons"]:
+                self._pending["reasons"] = (self._pending["reasons"] + [reason])[-MAX_COALESCED_REASONS:]
+            self._condition.notify()
+
+    def clear(self):
+        """The user is focused again: drop an alert that is still waiting out the rate limit"""
+        with self._condition:
+            if self._pending is not None:
+                self.stats["dropped"] += 1
+                self._pending = None
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        for sink_queue in self._sink_queues:
+            sink_queue.put(None)
+
+    def _dispatch_loop(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._pending is not None:
+                        wait = self._last_delivery + self.min_interval - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._condition.wait(wait)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    return
+                alert, self._pending = self._pending, None
+                self._last_delivery = time.monotonic()
+                self.stats["delivered"] += 1
+            for sink_queue in self._sink_queues:
+                sink_queue.put(alert)
+
+    @staticmethod
+    def _sink_loop(sink, sink_queue):
+        while True:
+            alert = sink_queue.get()
+            if alert is None:
+                return
+            try:
+                sink.send(alert)
+            except Exception as e:
+                print(f"Intervention sink {sink.name} failed: {e}")
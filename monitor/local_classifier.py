@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import math
+import zlib
+import random
+import struct
+from array import array
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import focus_log
+from common.text_tokens import tokenize
+
+# Snapshot features recorded by the monitor, joined with the focus log by timestamp for training
+FEATURE_LOG = "../focus_features.jsonl"
+# Trained model: hashed TF-IDF weights + logistic regression coefficients
+MODEL_FILE = "../focus_classifier.bin"
+# Maximum number of OCR characters stored per snapshot
+MAX_SCREEN_CHARS = 2000
+# Hashed feature space size (2^16 float32 weights = 256 KB per array)
+FEATURE_DIM = 1 << 16
+# Use the local verdict only when its probability for the predicted class reaches this value
+LOCAL_CLASSIFIER_THRESHOLD = 0.9
+
+_MODEL_MAGIC = b"DKLC"
+_MODEL_VERSION = 1
+
+
+# ---------------------------
+# Feature recording and extraction
+def record_features(timestamp, goal, screen_content, windows, foreground):
+    """Append the features of one snapshot to FEATURE_LOG"""
+    record = {
+        "timestamp": timestamp,
+        "goal": goal,
+        "foreground": foreground,
+        "windows": windows,
+        "screen": screen_content[:MAX_SCREEN_CHARS],
+    }
+    with open(FEATURE_LOG, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _hash_token(token):
+    return zlib.crc32(token.encode("utf-8")) % FEATURE_DIM
+
+
+def extract_counts(goal, screen_content, windows, foreground):
+    """Hashed term counts for one snapshot; goal tokens that appear on screen get their own feature"""
+    goal_tokens = set(tokenize(goal))
+    counts = {}
+    prefixed = [("s:", tokenize(screen_content)),
+                ("w:", tokenize(" ".join(windows))),
+                ("f:", tokenize(foreground))]
+    for prefix, tokens in prefixed:
+        for token in tokens:
+            index = _hash_token(prefix + token)
+            counts[index] = counts.get(index, 0) + 1
+            if token in goal_tokens:
+                index = _hash_token("goal_match:" + prefix)
+                counts[index] = counts.get(index, 0) + 1
+    return counts
+
+
+def tfidf_vector(counts, idf):
+    """Sub-linear TF times IDF, L2-normalised, as a sparse dict"""
+    vector = {index: (1 + math.log(count)) * idf[index] for index, count in counts.items()}
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    if norm > 0:
+        vector = {index: value / norm for index, value in vector.items()}
+    return vector
+
+
+# ---------------------------
+# Model
+class LocalClassifier:
+    """Logistic regression over hashed TF-IDF features; predicts P(distracted)"""
+
+    def __init__(self, idf, weights, bias):
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+
+    def probability(self, vector):
+        z = self.bias + sum(self.weights[index] * value for index, value in vector.items())
+        z = max(-30.0, min(30.0, z))
+        return 1 / (1 + math.exp(-z))
+
+    def predict(self, goal, screen_content, windows, foreground):
+        """Return (verdict dict, confidence of the predicted class)"""
+        vector = tfidf_vector(extract_counts(goal, screen_content, windows, foreground), self.idf)
+        p_distracted = self.probability(vector)
+        if p_distracted >= 0.5:
+            return {"status": "2. Distracted",
+                    "reason": "Screen content looks unrelated to the work goal"}, p_distracted
+        return {"status": "1. Focused"}, 1 - p_distracted
+
+    def save(self, path=MODEL_FILE):
+        with open(path, "wb") as f:
+            f.write(_MODEL_MAGIC + struct.pack("<IIf", _MODEL_VERSION, FEATURE_DIM, self.bias))
+            self.idf.tofile(f)
+            self.weights.tofile(f)
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        with open(path, "rb") as f:
+            if f.read(4) != _MODEL_MAGIC:
+                raise ValueError(f"{path} is not a focus classifier file")
+            version, dim, bias = struct.unpack("<IIf", f.read(12))
+            if version != _MODEL_VERSION or dim != FEATURE_DIM:
+                raise ValueError(f"Unsupported classifier file version {version} / dimension {dim}")
+            idf = array("f")
+            idf.fromfile(f, dim)
+            weights = array("f")
+            weights.fromfile(f, dim)
+        return cls(idf, weights, bias)
+
+
+# ---------------------------
+# Training data
+def load_model_labels(log_file):
+    """Map timestamp -> is_distracted for log entries labelled by the remote model"""
+    labels = {}
+    for record in focus_log.iter_records(log_file):
+        data = record["output"]
+        # Entries without a source predate source tagging and all came from the model
+        if data.get("source", "model") != "model":
+            continue
+        labels[record["timestamp"]] = data.get("status", "").startswith("2")
+    return labels
+
+
+def load_training_data(log_file, feature_log=FEATURE_LOG):
+    """Pair recorded snapshot features with the model verdict logged at the same timestamp"""
+    labels = load_model_labels(log_file)
+    samples = []
+    if not os.path.exists(feature_log):
+        return samples
+    with open(feature_log, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("timestamp") in labels:
+                counts = extract_counts(record.get("goal", ""), record.get("screen", ""),
+                                        record.get("windows", []), record.get("foreground", ""))
+                samples.append((record["timestamp"], counts, labels[record["timestamp"]]))
+    samples.sort(key=lambda sample: sample[0])
+    return samples
+
+
+# ---------------------------
+# Training and evaluation
+def fit(samples, epochs=8, learning_rate=0.5, l2=1e-4, seed=0):
+    """Fit IDF weights and a logistic regression with SGD on (timestamp, counts, label) samples"""
+    document_frequency = {}
+    for _, counts, _ in samples:
+        for index in counts:
+            document_frequency[index] = document_frequency.get(index, 0) + 1
+    n = len(samples)
+    idf = array("f", [math.log((1 + n) / 1) + 1]) * FEATURE_DIM
+    for index, df in document_frequency.items():
+        idf[index] = math.log((1 + n) / (1 + df)) + 1
+
+    vectors = [(tfidf_vector(counts, idf), 1.0 if label else 0.0) for _, counts, label in samples]
+    # Balance classes: distraction verdicts are usually the minority
+    positives = sum(label for _, label in vectors)
+    negatives = len(vectors) - positives
+    class_weight = {1.0: len(vectors) / (2 * positives) if positives else 1.0,
+                    0.0: len(vectors) / (2 * negatives) if negatives else 1.0}
+
+    weights = array("f", [0.0]) * FEATURE_DIM
+    model = LocalClassifier(idf, weights, 0.0)
+    rng = random.Random(seed)
+    order = list(range(len(vectors)))
+    for epoch in range(epochs):
+        rng.shuffle(order)
+        rate = learning_rate / (1 + epoch)
+        for i in order:
+            vector, label = vectors[i]
+            gradient = (model.probability(vector) - label) * class_weight[label]
+            for index, value in vector.items():
+                weights[index] -= rate * (gradient * value + l2 * weights[index])
+            model.bias -= rate * gradient
+    return model
+
+
+def evaluate(model, samples, threshold=LOCAL_CLASSIFIER_THRESHOLD):
+    """
+    Compare local predictions with the model labels.
+    Returns overall agreement, the share of snapshots confident enough to skip
+    the remote call, and the agreement on those confident snapshots.
+    """
+    agree = confident = confident_agree = 0
+    for _, counts, label in samples:
+        p_distracted = model.probability(tfidf_vector(counts, model.idf))
+        predicted = p_distracted >= 0.5
+        confidence = p_distracted if predicted else 1 - p_distracted
+        agree += predicted == label
+        if confidence >= threshold:
+            confident += 1
+            confident_agree += predicted == label
+    total = len(samples)
+    return {
+        "samples": total,
+        "agreement": agree / total if total else 0.0,
+        "remote_calls_avoided": confident / total if total else 0.0,
+        "agreement_when_confident": confident_agree / confident if confident else 0.0,
+        "threshold": threshold,
+    }
+
+
+def train_local_classifier(log_file, feature_log=FEATURE_LOG, model_file=MODEL_FILE,
+                           threshold=LOCAL_CLASSIFIER_THRESHOLD, test_ratio=0.2):
+    """
+    Train on the oldest snapshots, evaluate on the most recent test_ratio of them,
+    then refit on everything and save the model. Returns the evaluation report.
+    """
+    samples = load_training_data(log_file, feature_log)
+    if len(samples) < 20:
+        raise ValueError(f"Only {len(samples)} model-labelled snapshots with features, need at least 20")
+    split = int(len(samples) * (1 - test_ratio))
+    report = evaluate(fit(samples[:split]), samples[split:], threshold)
+    report["train_samples"] = split
+    report["trained_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    model = fit(samples)
+    model.save(model_file)
+    report["model_file"] = model_file
+    report["model_bytes"] = os.path.getsize(model_file)
+    return report
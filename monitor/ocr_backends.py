@@ -0,0 +1,110 @@
+import queue
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+# OCR language and Tesseract data directory used by the engine pool
+OCR_LANG = "chi_sim"
+TESSDATA_PATH = r"C:\Program Files\Tesseract-OCR\tessdata"
+# Number of warm engine instances kept by the pool backend
+OCR_POOL_SIZE = 2
+
+
+# ---------------------------
+# Backend interface
+class OCRBackend:
+    """Base class for OCR backends: turn a PIL image into text"""
+    name = "base"
+
+    def image_to_string(self, img):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# ---------------------------
+# Fallback: pytesseract (starts a tesseract process per call)
+class PytesseractBackend(OCRBackend):
+    name = "pytesseract"
+
+    def __init__(self, lang=OCR_LANG):
+        self.lang = lang
+
+    def image_to_string(self, img):
+        return pytesseract.image_to_string(img, lang=self.lang)
+
+
+# ---------------------------
+# Pool of warm tesserocr engines (traineddata loaded once per engine)
+class TesserocrPoolBackend(OCRBackend):
+    name = "tesserocr"
+
+    def __init__(self, lang=OCR_LANG, pool_size=None, tessdata_path=TESSDATA_PATH):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        if pool_size is None:
+            pool_size = OCR_POOL_SIZE
+        self.lang = lang
+        self._engines = queue.Queue()
+        self._all_engines = []
+        try:
+            # Load the traineddata once per engine up front so every call hits a warm engine
+            for _ in range(pool_size):
+                engine = tesserocr.PyTessBaseAPI(path=tessdata_path, lang=lang)
+                self._all_engines.append(engine)
+                self._engines.put(engine)
+        except Exception:
+            self.close()
+            raise
+
+    def image_to_string(self, img):
+        engine = self._engines.get()
+        try:
+            engine.SetImage(img)
+            return engine.GetUTF8Text()
+        finally:
+            self._engines.put(engine)
+
+    def close(self):
+        for engine in self._all_engines:
+            engine.End()
+        self._all_engines = []
+
+
+# ---------------------------
+# Backend selection
+def create_ocr_backend(name="auto"):
+    """
+    Create an OCR backend by name: "tesserocr", "pytesseract" or "auto"
+    ("auto" uses the warm engine pool when tesserocr is available and falls back to pytesseract).
+    """
+    if name in ("auto", "tesserocr"):
+        try:
+            return TesserocrPoolBackend()
+        except Exception as e:
+            if name == "tesserocr":
+                raise
+            print(f"OCR engine pool unavailable ({e}), falling back to pytesseract")
+    return PytesseractBackend()
+
+
+# ---------------------------
+# Process pool workers: every worker process keeps its own warm backend
+_worker_backend = None
+
+
+def init_ocr_worker(name="auto"):
+    """ProcessPoolExecutor initializer: create one single-engine backend per worker process"""
+    global _worker_backend, OCR_POOL_SIZE
+    OCR_POOL_SIZE = 1
+    _worker_backend = create_ocr_backend(name)
+
+
+def ocr_worker(img):
+    """OCR one image inside a worker process"""
+    return _worker_backend.image_to_string(img)
@@ -0,0 +1,93 @@
+from PIL import Image, ImageOps, ImageStat
+
+# Screen scaling factor (1.0 = 96 DPI). None detects it from Windows when possible.
+SCREEN_SCALE = None
+# Grey level used by the binarization step
+BINARIZE_THRESHOLD = 128
+# Margin in pixels kept around the detected text region
+CROP_MARGIN = 8
+
+# Preprocessing presets: ordered list of steps applied before OCR
+PREPROCESS_PRESETS = {
+    "none": [],
+    "grey": ["grayscale"],
+    "grey_downscale": ["grayscale", "downscale"],
+    "binary": ["grayscale", "binarize"],
+    "fast": ["grayscale", "downscale", "binarize", "crop_text"],
+}
+
+
+# ---------------------------
+# Preprocessing steps
+def detect_screen_scale():
+    """Return the display scaling factor (e.g. 1.5 for 150%), 1.0 when it cannot be detected"""
+    if SCREEN_SCALE:
+        return SCREEN_SCALE
+    try:
+        import ctypes
+        return ctypes.windll.shcore.GetScaleFactorForDevice(0) / 100
+    except Exception:
+        return 1.0
+
+
+def to_grayscale(img):
+    return img.convert("L")
+
+
+def downscale(img):
+    """
+    Scale a high-DPI screenshot back to 96 DPI: text rendered at 150%/200% is
+    still readable for Tesseract at 100% and costs far fewer pixels.
+    """
+    scale = detect_screen_scale()
+    if scale <= 1.0:
+        return img
+    width, height = img.size
+    return img.resize((max(1, int(width / scale)), max(1, int(height / scale))), Image.BILINEAR)
+
+
+def binarize(img):
+    """Threshold to black text on white, inverting dark-themed screens first"""
+    grey = img.convert("L")
+    if ImageStat.Stat(grey).mean[0] < BINARIZE_THRESHOLD:
+        grey = ImageOps.invert(grey)
+    return grey.point(lambda value: 255 if value >= BINARIZE_THRESHOLD else 0)
+
+
+def crop_text(img):
+    """
+    Crop to the bounding box of the non-background content.
+    Returns None when the image has no content at all.
+    """
+    grey = img.convert("L")
+    # Treat the most common grey level as background
+    histogram = grey.histogram()
+    background = histogram.index(max(histogram))
+    content = grey.point(lambda value: 255 if abs(value - background) > 32 else 0)
+    box = content.getbbox()
+    if box is None:
+        return None
+    left, top, right, bottom = box
+    width, height = img.size
+    return img.crop((max(0, left - CROP_MARGIN), max(0, top - CROP_MARGIN),
+                     min(width, right + CROP_MARGIN), min(height, bottom + CROP_MARGIN)))
+
+
+PREPROCESS_STEPS = {
+    "grayscale": to_grayscale,
+    "downscale": downscale,
+    "binarize": binarize,
+    "crop_text": crop_text,
+}
+
+
+def preprocess(img, preset="none"):
+    """
+    Run an image through a preprocessing preset.
+    Returns None when a step finds nothing worth OCRing (e.g. a blank tile).
+    """
+    for step in PREPROCESS_PRESETS[preset]:
+        img = PREPROCESS_STEPS[step](img)
+        if img is None:
+            return None
+    return img
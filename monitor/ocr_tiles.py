@@ -0,0 +1,163 @@
+import hashlib
+from collections import OrderedDict
+
+# Grid used to split a frame for tile-level OCR: (columns, rows)
+OCR_TILE_GRID = (2, 6)
+# Number of horizontal bands used by the "bands" strategy
+OCR_BAND_COUNT = 8
+# Maximum number of tile OCR results kept in the LRU cache
+OCR_TILE_CACHE_SIZE = 256
+
+
+# ---------------------------
+# Splitting a frame into tiles
+def split_into_tiles(img, grid=OCR_TILE_GRID):
+    """
+    Split an image into a grid of tiles.
+    Returns a list of (box, tile) in reading order (row by row, left to right).
+    """
+    cols, rows = grid
+    width, height = img.size
+    tiles = []
+    for row in range(rows):
+        top = height * row // rows
+        bottom = height * (row + 1) // rows
+        for col in range(cols):
+            left = width * col // cols
+            right = width * (col + 1) // cols
+            box = (left, top, right, bottom)
+            tiles.append((box, img.crop(box)))
+    return tiles
+
+
+def split_into_bands(img, band_count=OCR_BAND_COUNT):
+    """
+    Split an image into full-width horizontal bands, moving each cut to the
+    emptiest nearby row so text lines are not cut in half.
+    Returns a list of (box, tile) from top to bottom.
+    """
+    width, height = img.size
+    if band_count <= 1 or height < band_count * 2:
+        return [((0, 0, width, height), img)]
+
+    # Per-row contrast on a narrowed grey copy: blank rows have (almost) no contrast
+    sample_width = min(width, 256)
+    grey = img.convert("L").resize((sample_width, height))
+    pixels = grey.tobytes()
+    row_ink = [max(pixels[y * sample_width:(y + 1) * sample_width]) - min(pixels[y * sample_width:(y + 1) * sample_width])
+               for y in range(height)]
+
+    search = max(1, height // (band_count * 3))
+    cuts = [0]
+    for i in range(1, band_count):
+        target = height * i // band_count
+        low = max(cuts[-1] + 1, target - search)
+        high = min(height - 1, target + search)
+        if low > high:
+            continue
+        cuts.append(min(range(low, high + 1), key=lambda y: (row_ink[y], abs(y - target))))
+    cuts.append(height)
+
+    tiles = []
+    for top, bottom in zip(cuts, cuts[1:]):
+        box = (0, top, width, bottom)
+        tiles.append((box, img.crop(box)))
+    return tiles
+
+
+def split_screen(img, strategy="bands", split_monitors=True):
+    """
+    Split a screenshot into OCR tiles in reading order.
+    strategy is "bands" (OCR_BAND_COUNT full-width text bands), "grid" (OCR_TILE_GRID;
+    its cuts run through text lines and glyphs) or "none".
+    When split_monitors is set and the capture recorded its monitor boxes
+    (img.info["monitors"]), every physical monitor is split separately, left to right.
+    """
+    regions = [(0, 0) + img.size]
+    if split_monitors and img.info.get("monitors"):
+        regions = sorted(img.info["monitors"], key=lambda box: (box[0], box[1]))
+
+    tiles = []
+    for region in regions:
+        region_img = img if region == (0, 0) + img.size else img.crop(region)
+        if strategy == "grid":
+            tiles.extend(tile for _, tile in split_into_tiles(region_img, OCR_TILE_GRID))
+        elif strategy == "bands":
+            tiles.extend(tile for _, tile in split_into_bands(region_img, OCR_BAND_COUNT))
+        else:
+            tiles.append(region_img)
+    return tiles
+
+
+def hash_tile(tile, pipeline=""):
+    """
+    Hash the pixel content and size of a tile, plus the OCR pipeline (backend and
+    preprocessing preset) so text produced by a different pipeline is never reused
+    """
+    digest = hashlib.blake2b(tile.tobytes(), digest_size=16)
+    digest.update(f"{tile.mode}{tile.size}{pipeline}".encode())
+    return digest.digest()
+
+
+# ---------------------------
+# LRU cache of tile OCR results
+class TileOCRCache:
+    """Remember the OCR text of recently seen tiles, keyed by tile hash"""
+
+    def __init__(self, max_size=OCR_TILE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.stats = {"tiles": 0, "ocr_tiles": 0}
+
+    def get(self, key):
+        text = self._entries.get(key)
+        if text is not None:
+            self._entries.move_to_end(key)
+        return text
+
+    def put(self, key, text):
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def hit_rate(self):
+        tiles = self.stats["tiles"]
+        return (tiles - self.stats["ocr_tiles"]) / tiles if tiles > 0 else 0.0
+
+
+def ocr_tiles(tiles, ocr_many, cache=None, pipeline=""):
+    """
+    OCR a list of tiles and stitch their texts back together in order.
+    ocr_many takes a list of tiles and returns their texts, so callers can run
+    the tiles in parallel. With a cache, only tiles whose hash is not cached are OCRed;
+    pipeline names the backend and preprocessing that ocr_many applies (see hash_tile).
+    Returns (text, number of tiles OCRed, number of tiles).
+    """
+    texts = [None] * len(tiles)
+    pending = []
+    keys = {}
+    for index, tile in enumerate(tiles):
+        if cache is not None:
+            key = hash_tile(tile, pipeline)
+            keys[index] = key
+            text = cache.get(key)
+            if text is not None:
+                texts[index] = text
+                continue
+        pending.append(index)
+
+    if pending:
+        results = ocr_many([tiles[index] for index in pending])
+        for index, text in zip(pending, results):
+            texts[index] = text.strip()
+            if cache is not None:
+                cache.put(keys[index], texts[index])
+
+    if cache is not None:
+        cache.stats["tiles"] += len(tiles)
+        cache.stats["ocr_tiles"] += len(pending)
+    return "\n".join(text for text in texts if text), len(pending), len(tiles)
@@ -0,0 +1,90 @@
+import os
+import json
+import threading
+
+# Snapshots that could not be classified because the model endpoint was unreachable
+SPOOL_FILE = "../focus_spool.jsonl"
+# Oldest snapshots are dropped beyond this many spooled entries
+MAX_SPOOL_ENTRIES = 1000
+# Maximum number of OCR characters stored per spooled snapshot
+MAX_SPOOL_SCREEN_CHARS = 4000
+# Seconds between replay attempts while the spool is not empty
+SPOOL_REPLAY_INTERVAL = 60
+# Spooled snapshots classified at the same time while draining
+SPOOL_REPLAY_CONCURRENCY = 3
+
+
+class OfflineSpool:
+    """
+    Append-only JSONL queue of snapshots waiting for a model verdict.
+    Each line holds the capture timestamp, goal, OCR text, window titles and foreground title.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or SPOOL_FILE
+        self._lock = threading.Lock()
+        self._count = None
+
+    def _read(self):
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+    def _write(self, records):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._count = len(records)
+
+    def __len__(self):
+        with self._lock:
+            if self._count is None:
+                self._count = len(self._read())
+            return self._count
+
+    def append(self, timestamp, goal, screen_content, windows, foreground):
+        record = {
+            "timestamp": timestamp,
+            "goal": goal,
+            "screen": (screen_content or "")[:MAX_SPOOL_SCREEN_CHARS],
+            "windows": list(windows),
+            "foreground": foreground,
+        }
+        with self._lock:
+            if self._count is None:
+                self._count = len(self._read())
+            if self._count >= MAX_SPOOL_ENTRIES:
+                self._write(self._read()[-(MAX_SPOOL_ENTRIES - 1):] + [record])
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._count += 1
+
+    def peek(self, limit=None):
+        """Oldest spooled records first"""
+        with self._lock:
+            records = self._read()
+        return records if limit is None else records[:limit]
+
+    def remove(self, timestamps):
+        """Drop the records with these timestamps (replayed or given up on)"""
+        timestamps = set(timestamps)
+        if not timestamps:
+            return
+        with self._lock:
+            records = [record for record in self._read() if record.get("timestamp") not in timestamps]
+            if records:
+                self._write(records)
+            else:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                self._count = 0
@@ -0,0 +1,166 @@
+import os
+import re
+import sys
+import unicodedata
+from collections import Counter, deque
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.text_tokens import tokenize
+
+# Estimated token budget for the screen text and for the window titles in one prompt
+PROMPT_TOKEN_BUDGET = 600
+WINDOW_TOKEN_BUDGET = 150
+# Lines shorter than this (after cleaning) are dropped as OCR noise; not applied to
+# window titles or CJK text, where two characters are a whole name (微信, 抖音)
+MIN_LINE_CHARS = 3
+# A line counts as noise when less than this share of its characters are letters, digits or CJK
+MIN_TEXT_RATIO = 0.6
+# Short lines (menus, toolbars, tab strips) seen in at least CHROME_MIN_SNAPSHOTS of the
+# last CHROME_HISTORY distinct snapshots are treated as repeated UI chrome and dropped;
+# snapshots whose line sets overlap by CHROME_DISTINCT_SIMILARITY or more count as one
+CHROME_HISTORY = 8
+CHROME_MIN_SNAPSHOTS = 4
+CHROME_MAX_WORDS = 6
+CHROME_DISTINCT_SIMILARITY = 0.8
+
+
+_CJK_PATTERN = re.compile(r"[一-鿿぀-ヿ가-힯]")
+
+
+def estimate_tokens(text):
+    """Rough token count: about one token per CJK character and per four other characters"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def clean_line(line):
+    """Normalise whitespace and drop stray symbols OCR picks up from icons and borders"""
+    line = unicodedata.normalize("NFKC", line)
+    line = re.sub(r"[|¦_~=<>^*•·]{2,}", " ", line)
+    return re.sub(r"\s+", " ", line).strip()
+
+
+def is_noise(line, min_chars=MIN_LINE_CHARS):
+    """True for lines that are mostly symbols or short gibberish fragments"""
+    if not line:
+        return True
+    if len(line) < min_chars and not _CJK_PATTERN.search(line):
+        return True
+    text_chars = sum(1 for ch in line if ch.isalnum())
+    if text_chars / len(line) < MIN_TEXT_RATIO:
+        return True
+    words = line.split()
+    # "a i l1 ~ e" style fragments: many words, none longer than two characters
+    return len(words) >= 3 and all(len(word) <= 2 for word in words) and not tokenize(line)
+
+
+def line_key(line):
+    """Dedupe key: case-insensitive with digits (clocks, counters) masked"""
+    return re.sub(r"\d", "0", line.casefold())
+
+
+class PromptBuilder:
+    """
+    Shrink OCR text and window titles to a token budget before they go into the
+    classification prompt: dedupe lines, drop OCR noise and repeated UI chrome,
+    rank the rest by relevance to the goal and keep the best lines in reading order.
+    """
+
+    def __init__(self):
+        self._history = deque(maxlen=CHROME_HISTORY)
+        self.last_stats = {"lines_in": 0, "lines_out": 0, "tokens_in": 0, "tokens_out": 0}
+
+    def clean_lines(self, screen_content, app_keys=(), min_chars=MIN_LINE_CHARS):
+        """
+        Cleaned, deduplicated, noise-free lines in reading order. Lines mentioning
+        a whitelisted/blacklisted app (casefolded app_keys) are never dropped as noise.
+        """
+        lines = []
+        seen = set()
+        for raw_line in (screen_content or "").splitlines():
+            line = clean_line(raw_line)
+            if not line:
+                continue
+            if is_noise(line, min_chars) and not any(app in line.casefold() for app in app_keys):
+                continue
+            key = line_key(line)
+            if key in seen:
+                continue
+            seen.add(key)
+            lines.append(line)
+        return lines
+
+    def _chrome_keys(self, keys):
+        """
+        Short lines that kept reappearing while the rest of the screen changed.
+        Near-identical snapshots are only counted once, so a static screen is not
+        mistaken for chrome.
+        """
+        keys = frozenset(keys)
+        if self._history:
+            previous = self._history[-1]
+            union = keys | previous
+            if union and len(keys & previous) / len(union) >= CHROME_DISTINCT_SIMILARITY:
+                self._history[-1] = keys
+            else:
+                self._history.append(keys)
+        else:
+            self._history.append(keys)
+        if len(self._history) < CHROME_MIN_SNAPSHOTS:
+            return set()
+        counts = Counter(key for snapshot in self._history for key in snapshot)
+        return {key for key in keys
+                if counts[key] >= CHROME_MIN_SNAPSHOTS and len(key.split()) <= CHROME_MAX_WORDS}
+
+    def score_line(self, line, goal_tokens, app_keys):
+        """Relevance of one line: goal term overlap, plus mentions of whitelisted/blacklisted apps"""
+        tokens = tokenize(line)
+        score = sum(1.0 for token in tokens if token in goal_tokens)
+        folded = line.casefold()
+        score += sum(2.0 for app in app_keys if app in folded)
+        # Mild preference for lines with real words over bare numbers and identifiers
+        return score + min(len(tokens), 10) * 0.05
+
+    def select(self, lines, goal, app_list, budget):
+        """Keep the highest-scoring lines that fit in the budget, returned in reading order"""
+        goal_tokens = set(tokenize(goal))
+        app_keys = [app.casefold() for app in app_list if app]
+        ranked = sorted(range(len(lines)), key=lambda i: -self.score_line(lines[i], goal_tokens, app_keys))
+        kept = []
+        used = 0
+        for i in ranked:
+            cost = estimate_tokens(lines[i]) + 1
+            if used + cost > budget:
+                continue
+            kept.append(i)
+            used += cost
+        return [lines[i] for i in sorted(kept)]
+
+    def compact_screen_text(self, goal, screen_content, app_list=(), budget=None):
+        """Return the budgeted screen text lines for one snapshot"""
+        budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+        app_keys = [app.casefold() for app in app_list if app]
+        lines = self.clean_lines(screen_content, app_keys)
+        goal_tokens = set(tokenize(goal))
+        chrome = self._chrome_keys([line_key(line) for line in lines])
+        # Chrome lines are still kept when they mention the goal or a listed app
+        lines = [line for line in lines
+                 if line_key(line) not in chrome
+                 or any(token in goal_tokens for token in tokenize(line))
+                 or any(app in line.casefold() for app in app_keys)]
+        kept = self.select(lines, goal, app_list, budget)
+        self.last_stats = {
+            "lines_in": len((screen_content or "").splitlines()),
+            "lines_out": len(kept),
+            "tokens_in": estimate_tokens(screen_content or ""),
+            "tokens_out": sum(estimate_tokens(line) + 1 for line in kept),
+        }
+        return kept
+
+    def compact_windows(self, goal, windows, app_list=(), budget=None):
+        """Deduplicated window titles within the window budget, the most relevant kept first"""
+        budget = WINDOW_TOKEN_BUDGET if budget is None else budget
+        app_keys = [app.casefold() for app in app_list if app]
+        # Titles are whole names, however short ("QQ"), so the length rule does not apply
+        titles = self.clean_lines("\n".join(windows), app_keys, min_chars=0)
+        return self.select(titles, goal, app_list, budget)
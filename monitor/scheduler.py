@@ -0,0 +1,115 @@
+import time
+import random
+import asyncio
+from collections import deque
+
+# Interval bounds (seconds): checks speed up to MIN_CHECK_INTERVAL after a state change
+# or distraction and back off by INTERVAL_BACKOFF per stable verdict up to MAX_CHECK_INTERVAL
+MIN_CHECK_INTERVAL = 60
+MAX_CHECK_INTERVAL = 900
+INTERVAL_BACKOFF = 1.5
+# Failed captures, OCR or model calls are retried after a jittered exponential backoff
+RETRY_BASE_DELAY = 5
+RETRY_MAX_DELAY = 120
+# Maximum number of remote model calls per rolling hour
+MAX_MODEL_CALLS_PER_HOUR = 30
+
+
+class AdaptiveScheduler:
+    """
+    Decide when the next screenshot is taken.
+    The pipeline stages report verdicts, failures and model calls; the capture
+    stage awaits sleep() between screenshots.
+    """
+
+    def __init__(self, initial_interval):
+        self.min_interval = MIN_CHECK_INTERVAL
+        self.max_interval = MAX_CHECK_INTERVAL
+        self.interval = min(max(initial_interval, self.min_interval), self.max_interval)
+        self.backoff = INTERVAL_BACKOFF
+        self.retry_base = RETRY_BASE_DELAY
+        self.retry_max = RETRY_MAX_DELAY
+        self.max_model_calls_per_hour = MAX_MODEL_CALLS_PER_HOUR
+        self.failures = 0
+        self.last_status = None
+        self.check_requested = False
+        self._model_calls = deque()
+        self._wakeup = asyncio.Event()
+
+    # ---------------------------
+    # Model call budget
+    def _prune_model_calls(self, now):
+        while self._model_calls and now - self._model_calls[0] >= 3600:
+            self._model_calls.popleft()
+
+    def record_model_call(self):
+        self._model_calls.append(time.time())
+
+    def budget_wait(self):
+        """Seconds until another model call fits in the hourly budget (0 when it fits now)"""
+        if not self.max_model_calls_per_hour:
+            return 0.0
+        now = time.time()
+        self._prune_model_calls(now)
+        if len(self._model_calls) < self.max_model_calls_per_hour:
+            return 0.0
+        return self._model_calls[0] + 3600 - now
+
+    def model_calls_last_hour(self):
+        self._prune_model_calls(time.time())
+        return len(self._model_calls)
+
+    # ---------------------------
+    # Feedback from the pipeline
+    def on_verdict(self, status):
+        """Shorten the interval after a state change or distraction, back off while stable"""
+        self.failures = 0
+        changed = self.last_status is not None and status != self.last_status
+        if changed or status.startswith("2"):
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        self.last_status = status
+        self._wakeup.set()
+
+    def on_failure(self):
+        """A capture, OCR or model stage failed: retry soon instead of waiting a full period"""
+        self.failures += 1
+        self._wakeup.set()
+
+    def request_check(self):
+        """Ask for a check as soon as possible (e.g. the window mix changed); still honours the budget"""
+        self.check_requested = True
+        self._wakeup.set()
+
+    # ---------------------------
+    # Scheduling
+    def next_delay(self):
+        if self.check_requested:
+            delay = 0.0
+        elif self.failures:
+            delay = min(self.retry_max, self.retry_base * 2 ** (self.failures - 1))
+            # Equal jitter: half fixed, half random, so retries from restarts do not line up
+            delay = delay / 2 + random.uniform(0, delay / 2)
+        else:
+            delay = self.interval
+        return max(delay, self.budget_wait())
+
+    async def sleep(self):
+        """
+        Sleep until the next check. Feedback arriving while asleep (e.g. a
+        distraction or failure) recomputes the deadline from the same start.
+        """
+        start = time.monotonic()
+        try:
+            while True:
+                self._wakeup.clear()
+                remaining = start + self.next_delay() - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    return
+        finally:
+            self.check_requested = False
@@ -0,0 +1,28 @@
+import sys
+import json
+
+import local_classifier
+from common import focus_log
+
+if __name__ == "__main__":
+    log_file = sys.argv[1] if len(sys.argv) > 1 else focus_log.LOG_FILE
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else local_classifier.LOCAL_CLASSIFIER_THRESHOLD
+
+    print("Training local focus classifier from model-labelled snapshots...")
+    try:
+        report = local_classifier.train_local_classifier(log_file, threshold=threshold)
+    except ValueError as e:
+        print(f"Training failed: {e}")
+        sys.exit(1)
+
+    print("-" * 50)
+    print(f"Training snapshots: {report['train_samples']}, held-out snapshots: {report['samples']}")
+    print(f"Agreement with the remote model: {report['agreement'] * 100:.1f}%")
+    print(f"Remote calls avoided at threshold {threshold}: {report['remote_calls_avoided'] * 100:.1f}%")
+    print(f"Agreement on the avoided calls: {report['agreement_when_confident'] * 100:.1f}%")
+    print(f"Model saved to {report['model_file']} ({report['model_bytes'] / 1024:.0f} KB)")
+
+    report_file = local_classifier.MODEL_FILE + ".report.json"
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Evaluation report saved to {report_file}")
@@ -0,0 +1,141 @@
+import re
+import time
+import zlib
+import random
+from collections import OrderedDict
+
+# Maximum number of cached verdicts and how long (seconds) a verdict stays valid
+VERDICT_CACHE_SIZE = 128
+VERDICT_CACHE_TTL = 1800
+# Minimum estimated Jaccard similarity of screen text and of the window set
+# for two snapshots to be treated as the same
+VERDICT_CACHE_SIMILARITY = 0.85
+# Character shingle length and MinHash signature length
+SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 64
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20240501)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(MINHASH_PERMUTATIONS)]
+
+
+# ---------------------------
+# Fingerprinting
+def normalize_text(text):
+    """Lower-case, collapse whitespace and mask digits (clocks, counters) in OCR text"""
+    text = re.sub(r"\d", "0", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of character shingles of the normalised text"""
+    text = normalize_text(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def minhash_signature(shingle_set):
+    """MinHash signature of a shingle set (empty tuple for an empty set)"""
+    if not shingle_set:
+        return ()
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_set]
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def signature_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    if not sig_a or not sig_b:
+        return 1.0 if sig_a == sig_b else 0.0
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+def window_similarity(windows_a, windows_b):
+    """Jaccard similarity of two window title sets"""
+    if not windows_a and not windows_b:
+        return 1.0
+    return len(windows_a & windows_b) / len(windows_a | windows_b)
+
+
+def normalize_goal(goal, white_list=(), black_list=()):
+    """Cache key part for the settings that shape a verdict"""
+    return "|".join([
+        normalize_text(goal or ""),
+        ",".join(sorted(normalize_text(app) for app in white_list if app)),
+        ",".join(sorted(normalize_text(app) for app in black_list if app)),
+    ])
+
+
+# ---------------------------
+# Verdict cache with TTL and LRU eviction
+class VerdictCache:
+    """
+    Remember recent model verdicts and reuse one when the goal matches and the
+    screen text and window set are similar enough.
+    """
+
+    def __init__(self, max_size=VERDICT_CACHE_SIZE, ttl=VERDICT_CACHE_TTL, similarity=VERDICT_CACHE_SIMILARITY):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self.stats = {"hits": 0, "misses": 0}
+
+    def fingerprint(self, goal_key, screen_content, windows):
+        """Build the lookup key: goal, MinHash of the screen text, sorted window set"""
+        window_set = frozenset(normalize_text(title) for title in windows)
+        return goal_key, minhash_signature(shingles(screen_content)), window_set
+
+    def _expire(self, now):
+        for entry_id in [entry_id for entry_id, entry in self._entries.items() if now - entry["time"] > self.ttl]:
+            del self._entries[entry_id]
+
+    def lookup(self, fingerprint):
+        """
+        Return (verdict, similarity) of the most similar valid entry above the
+        threshold, or (None, best similarity) on a miss.
+        """
+        goal_key, signature, window_set = fingerprint
+        now = time.time()
+        self._expire(now)
+        best_id, best_similarity = None, 0.0
+        for entry_id, entry in self._entries.items():
+            if entry["goal"] != goal_key:
+                continue
+            similarity = min(signature_similarity(signature, entry["signature"]),
+                             window_similarity(window_set, entry["windows"]))
+            if similarity > best_similarity:
+                best_id, best_similarity = entry_id, similarity
+        if best_id is not None and best_similarity >= self.similarity:
+            self._entries.move_to_end(best_id)
+            self.stats["hits"] += 1
+            return self._entries[best_id]["verdict"], best_similarity
+        self.stats["misses"] += 1
+        return None, best_similarity
+
+    def store(self, fingerprint, verdict):
+        goal_key, signature, window_set = fingerprint
+        self._entries[self._next_id] = {
+            "goal": goal_key,
+            "signature": signature,
+            "windows": window_set,
+            "verdict": verdict,
+            "time": time.time(),
+        }
+        self._next_id += 1
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "hits": self.stats["hits"],
+            "misses": self.stats["misses"],
+            "hit_rate": self.stats["hits"] / lookups if lookups > 0 else 0.0,
+            "size": len(self._entries)
+        }
@@ -0,0 +1,82 @@
+import time
+from collections import deque
+
+# Seconds between cheap window samples
+WINDOW_SAMPLE_INTERVAL = 5
+# Samples kept in the ring buffer (one hour at the default interval)
+WINDOW_BUFFER_SIZE = 720
+# A foreground app switch must last this many samples before it counts
+FOREGROUND_DWELL_SAMPLES = 2
+# Jaccard distance between the visible app sets that counts as a significant change
+WINDOW_CHANGE_THRESHOLD = 0.5
+# Minimum seconds between two checks triggered by window changes
+MIN_TRIGGER_GAP = 30
+
+
+def app_name(title):
+    """
+    Reduce a window title to its application name: Windows titles usually end
+    with " - <App>" (e.g. "main.py - DuKe - Visual Studio Code").
+    """
+    title = (title or "").strip()
+    if " - " in title:
+        return title.rsplit(" - ", 1)[1].strip()
+    return title
+
+
+class WindowSampler:
+    """
+    Ring buffer of cheap (foreground, visible windows) samples.
+    Tracks per-app foreground time and detects when the window mix has changed
+    enough since the last expensive check to warrant a new one.
+    """
+
+    def __init__(self):
+        self.samples = deque(maxlen=WINDOW_BUFFER_SIZE)
+        self.durations = {}
+        self.baseline = None
+        self.last_trigger = 0.0
+
+    def add_sample(self, foreground, windows, now=None):
+        now = time.time() if now is None else now
+        sample = (now, app_name(foreground), frozenset(app_name(title) for title in windows))
+        if self.samples:
+            # Credit the time since the previous sample to the previous foreground app
+            previous_time, previous_app, _ = self.samples[-1]
+            if previous_app:
+                elapsed = min(now - previous_time, WINDOW_SAMPLE_INTERVAL * 3)
+                self.durations[previous_app] = self.durations.get(previous_app, 0) + elapsed
+        self.samples.append(sample)
+        if self.baseline is None:
+            self.baseline = sample
+
+    def mark_checked(self):
+        """Use the latest sample as the baseline for the next comparison"""
+        if self.samples:
+            self.baseline = self.samples[-1]
+
+    def significant_change(self):
+        """True when the foreground app switched (and stayed) or the visible app set changed a lot"""
+        if self.baseline is None or len(self.samples) < FOREGROUND_DWELL_SAMPLES:
+            return False
+        if time.time() - self.last_trigger < MIN_TRIGGER_GAP:
+            return False
+        _, baseline_app, baseline_windows = self.baseline
+        recent = list(self.samples)[-FOREGROUND_DWELL_SAMPLES:]
+        if all(app != baseline_app for _, app, _ in recent) and len({app for _, app, _ in recent}) == 1:
+            return True
+        latest_windows = recent[-1][2]
+        union = latest_windows | baseline_windows
+        distance = 1 - len(latest_windows & baseline_windows) / len(union) if union else 0.0
+        return distance >= WINDOW_CHANGE_THRESHOLD
+
+    def trigger(self):
+        """Record that a check was triggered and reset the baseline"""
+        self.last_trigger = time.time()
+        self.mark_checked()
+
+    def pop_durations(self):
+        """Return foreground seconds per app since the last call (rounded) and reset them"""
+        durations = {app: round(seconds) for app, seconds in self.durations.items() if round(seconds) > 0}
+        self.durations = {}
+        return durations
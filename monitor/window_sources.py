@@ -0,0 +1,288 @@
+import os
+import sys
+import time
+import threading
+
+try:
+    import win32gui
+except ImportError:
+    win32gui = None
+
+try:
+    from Xlib import X, display as xdisplay
+except ImportError:
+    xdisplay = None
+
+# Window titles that are never reported
+IGNORED_WINDOWS = ['Program Manager', 'Microsoft Text Input Application']
+# Poll interval (seconds) for sources without native foreground-change events
+FOREGROUND_POLL_INTERVAL = 1.0
+
+
+# ---------------------------
+# Window source interface
+class WindowSource:
+    """
+    Where window titles come from. Subclasses implement list_windows() and
+    foreground(); watch_foreground() emits foreground-change events by polling
+    unless the platform offers native events.
+    """
+    name = "base"
+
+    def __init__(self):
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+
+    def list_windows(self):
+        """Titles of the visible application windows"""
+        raise NotImplementedError
+
+    def foreground(self):
+        """Title of the foreground window"""
+        raise NotImplementedError
+
+    def watch_foreground(self, callback):
+        """Call callback(title) from a background thread whenever the foreground window changes"""
+        self.stop_watching()
+        self._watch_stop = threading.Event()
+        self._watch_thread = threading.Thread(target=self._watch_loop, args=(callback, self._watch_stop),
+                                              name=f"{self.name}-foreground-watch", daemon=True)
+        self._watch_thread.start()
+
+    def _watch_loop(self, callback, stop):
+        last = None
+        while not stop.is_set():
+            try:
+                title = self.foreground()
+                if title != last:
+                    last = title
+                    callback(title)
+            except Exception as e:
+                print(f"Foreground polling error: {e}")
+            stop.wait(FOREGROUND_POLL_INTERVAL)
+
+    def stop_watching(self):
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(timeout=2)
+            self._watch_thread = None
+
+
+# ---------------------------
+# Windows: win32gui enumeration + SetWinEventHook foreground events
+class Win32WindowSource(WindowSource):
+    name = "windows"
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WM_QUIT = 0x0012
+
+    def __init__(self):
+        if win32gui is None:
+            raise RuntimeError("win32gui is not available")
+        super().__init__()
+        self._hook_thread_id = None
+
+    def list_windows(self):
+        apps = []
+
+        def get_windows(hwnd, _):
+            title = win32gui.GetWindowText(hwnd)
+            if win32gui.IsWindowVisible(hwnd) and title and title not in IGNORED_WINDOWS:
+                apps.append(title)
+
+        win32gui.EnumWindows(get_windows, None)
+        return apps
+
+    def foreground(self):
+        return win32gui.GetWindowText(win32gui.GetForegroundWindow())
+
+    def _watch_loop(self, callback, stop):
+        import ctypes
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND, wintypes.LONG,
+                                          wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+        def on_event(hook, event, hwnd, id_object, id_child, thread_id, timestamp):
+            try:
+                callback(win32gui.GetWindowText(hwnd))
+            except Exception as e:
+                print(f"Foreground event error: {e}")
+
+        proc = WinEventProc(on_event)
+        hook = user32.SetWinEventHook(self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND, 0, proc,
+                                      0, 0, self.WINEVENT_OUTOFCONTEXT)
+        if not hook:
+            print("SetWinEventHook failed, falling back to polling")
+            super()._watch_loop(callback, stop)
+            return
+        self._hook_thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        try:
+            # The hook delivers events through this thread's message loop
+            msg = wintypes.MSG()
+            while not stop.is_set() and user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            user32.UnhookWinEvent(hook)
+            self._hook_thread_id = None
+
+    def stop_watching(self):
+        self._watch_stop.set()
+        if self._hook_thread_id is not None:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._hook_thread_id, self.WM_QUIT, 0, 0)
+        super().stop_watching()
+
+
+# ---------------------------
+# X11: EWMH properties via python-xlib, _NET_ACTIVE_WINDOW property events
+class X11WindowSource(WindowSource):
+    name = "x11"
+
+    def __init__(self):
+        if xdisplay is None:
+            raise RuntimeError("python-xlib is not installed")
+        if not os.environ.get("DISPLAY"):
+            raise RuntimeError("no X display (DISPLAY is not set)")
+        super().__init__()
+        # Shared by the window sampler, snapshot preparation and the foreground-event
+        # stage, which call in from different executor threads: Xlib displays are not
+        # thread-safe, so every request on this connection goes through the lock
+        self._display_lock = threading.Lock()
+        self._display = xdisplay.Display()
+        self._root = self._display.screen().root
+        self._atoms = {name: self._display.intern_atom(name) for name in
+                       ("_NET_CLIENT_LIST", "_NET_ACTIVE_WINDOW", "_NET_WM_NAME", "UTF8_STRING")}
+
+    def _title(self, display, window_id):
+        if not window_id:
+            return ""
+        window = display.create_resource_object("window", window_id)
+        try:
+            prop = window.get_full_property(self._atoms["_NET_WM_NAME"], self._atoms["UTF8_STRING"])
+            if prop is not None:
+                value = prop.value
+                return value.decode("utf-8", "replace") if isinstance(value, bytes) else str(value)
+            name = window.get_wm_name()
+            return name or ""
+        except Exception:
+            return ""
+
+    def list_windows(self):
+        with self._display_lock:
+            prop = self._root.get_full_property(self._atoms["_NET_CLIENT_LIST"], X.AnyPropertyType)
+            if prop is None:
+                return []
+            titles = [self._title(self._display, window_id) for window_id in prop.value]
+        return [title for title in titles if title and title not in IGNORED_WINDOWS]
+
+    def _active_title(self, display, root):
+        prop = root.get_full_property(self._atoms["_NET_ACTIVE_WINDOW"], X.AnyPropertyType)
+        return self._title(display, prop.value[0]) if prop is not None and len(prop.value) else ""
+
+    def foreground(self):
+        with self._display_lock:
+            return self._active_title(self._display, self._root)
+
+    def _watch_loop(self, callback, stop):
+        # A separate connection: Xlib displays are not thread-safe
+        display = xdisplay.Display()
+        root = display.screen().root
+        root.change_attributes(event_mask=X.PropertyChangeMask)
+        last = None
+        try:
+            while not stop.is_set():
+                if not display.pending_events():
+                    stop.wait(0.1)
+                    continue
+                event = display.next_event()
+                if event.type == X.PropertyNotify and event.atom == self._atoms["_NET_ACTIVE_WINDOW"]:
+                    title = self._active_title(display, root)
+                    if title != last:
+                        last = title
+                        callback(title)
+        finally:
+            display.close()
+
+
+# ---------------------------
+# In-memory source for tests, benchmarks and CI boxes without a desktop session
+# (pair it with focus_monitor.CAPTURE_MODE = "fake", screen capture needs a display too)
+class FakeWindowSource(WindowSource):
+    name = "fake"
+
+    def __init__(self, windows=None, foreground=""):
+        super().__init__()
+        self._windows = list(windows or [])
+        self._foreground = foreground
+        self._callback = None
+        self._lock = threading.Lock()
+
+    def list_windows(self):
+        with self._lock:
+            return list(self._windows)
+
+    def foreground(self):
+        with self._lock:
+            return self._foreground
+
+    def set_windows(self, windows):
+        with self._lock:
+            self._windows = list(windows)
+
+    def set_foreground(self, title):
+        """Switch the foreground window, emitting an event when it changed"""
+        with self._lock:
+            changed = title != self._foreground
+            self._foreground = title
+            if title not in self._windows:
+                self._windows.append(title)
+            callback = self._callback
+        if changed and callback is not None:
+            callback(title)
+
+    def play(self, timeline, speed=1.0):
+        """
+        Replay a [(seconds, foreground title), ...] timeline in a background thread,
+        e.g. to benchmark the monitor loop without a desktop.
+        """
+        def run():
+            start = time.monotonic()
+            for at, title in timeline:
+                delay = start + at / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self.set_foreground(title)
+
+        thread = threading.Thread(target=run, name="fake-window-timeline", daemon=True)
+        thread.start()
+        return thread
+
+    def watch_foreground(self, callback):
+        self._callback = callback
+
+    def stop_watching(self):
+        self._callback = None
+
+
+# ---------------------------
+# Source selection
+def create_window_source(name="auto"):
+    """
+    Create a window source by name: "windows", "x11", "fake" or "auto"
+    ("auto" picks the platform source and falls back to the fake one).
+    """
+    if name == "windows":
+        return Win32WindowSource()
+    if name == "x11":
+        return X11WindowSource()
+    if name == "fake":
+        return FakeWindowSource()
+    try:
+        if sys.platform == "win32":
+            return Win32WindowSource()
+        return X11WindowSource()
+    except Exception as e:
+        print(f"No desktop window source available ({e}), using the in-memory fake source")
+        return FakeWindowSource()